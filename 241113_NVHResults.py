@@ -1,159 +1,79 @@
 import os
-import zipfile
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import streamlit as st
 
+from nvh.metadata import load_bead_index, load_metadata
+from nvh.plotting import build_signal_figure
+from nvh.rowindex import load_signal_range
+from nvh.signals import list_signal_members, load_signals
+from nvh.timing import timing_session
+from nvh.ui import (
+    bead_focus_options, bead_picker, debug_options, ingest_panel, prefetch_neighbours, rendering_options,
+    server_dataset, session_id, show_figure, timing_panel, unknown_labels_warning, validation_panel
+)
+
 # Set page layout to wide
 st.set_page_config(layout="wide")
 
 # Function to extract ZIP file and list all CSV files, including those in subdirectories
 def extract_zip_and_list_files(zip_file):
-    csv_files = []
-    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-        for file in zip_ref.namelist():
-            if file.endswith(".csv"):  # Check if the file is a CSV
-                csv_files.append(file)
-    return csv_files
-
-# Function to load the summary table from GitHub directly
-def load_summary_data_from_github():
-    url = "https://raw.githubusercontent.com/meliaph-monitech/NVH_ModelComparisonResults/refs/heads/main/241113_NVH_metadata.csv"
-    return pd.read_csv(url)
-
-# Function to update class names in the summary dataframe
-def update_class_names_in_summary(summary_df):
-    class_name_map = {
-        0.0: "Hot Melt",
-        1.0: "OK",
-        2.0: "Poor Appearance",
-        3.0: "Weak Weld"
-    }
-
-    # Update the _Prediction columns with new class names
-    for col in summary_df.columns:
-        if col.endswith("_Prediction"):
-            summary_df[col] = summary_df[col].map(class_name_map).fillna(summary_df[col])
-    
-    return summary_df
+    # Signal files (CSV, or converted .npy / .parquet) of an uploaded ZIP, a server ZIP or a server directory
+    return list_signal_members(zip_file)
 
 # Function to load and plot CSV data with highlights based on predictions
-def load_and_plot_csv_with_highlights(file, summary_df, selected_model):
-    raw_data = pd.read_csv(file)
-
-    class_color_map = {
-        "Hot Melt": "blue",
-        "OK": "red",
-        "Poor Appearance": "green",
-        "Weak Weld": "purple"
-    }
-
-    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1)
-
-    # Add all data traces with updated legend name
-    fig.add_trace(go.Scatter(
-        x=raw_data.index, 
-        y=raw_data.iloc[:, 0], 
-        mode='lines', 
-        line=dict(color='gray', width=1), 
-        name='All Data'  # Change legend name for All Data
-    ), row=1, col=1)
-
-    fig.add_trace(go.Scatter(
-        x=raw_data.index, 
-        y=raw_data.iloc[:, 1], 
-        mode='lines', 
-        line=dict(color='gray', width=1), 
-        name='All Data',  # Change legend name for All Data
-        showlegend=False  # Suppress duplicate legend entry
-    ), row=2, col=1)
-
-    # Reorder the predictions to have "OK" at the top
-    file_info = summary_df[summary_df["file"] == os.path.basename(file.name)]
-    added_classes = set()  # Track added classes for legends
-    prediction_order = ["OK", "Hot Melt", "Poor Appearance", "Weak Weld"]
-
-    for pred in prediction_order:
-        # For each class in the desired order
-        class_rows = file_info[file_info[selected_model] == pred]
+def load_and_plot_csv_with_highlights(file_name, signals, bead_index, selected_model, point_budget=None, x_offset=0):
+    # Gray baseline plus one NaN-separated highlight trace per class and channel
+    fig = build_signal_figure(file_name, signals, bead_index, selected_model, point_budget, x_offset=x_offset,
+                              title="Data Visualization with Predictions and Bead Numbers")
 
-        for idx, row in class_rows.iterrows():
-            start_idx = int(row["start_index"])
-            end_idx = int(row["end_index"])
-            prediction = row[selected_model]
-            bead_number = row["bead_number"]
-
-            if pd.isna(prediction):
-                continue
-
-            color = class_color_map.get(prediction, "black")
-
-            hover_template = f"Bead Number: {bead_number}<br>Class: {prediction}"
-
-            show_legend = prediction not in added_classes  # Only show legend for first appearance
-
-            fig.add_trace(go.Scatter(
-                x=raw_data.index[start_idx:end_idx + 1],
-                y=raw_data.iloc[start_idx:end_idx + 1, 0],
-                mode='lines',
-                line=dict(color=color, width=1),
-                name=f"Class {prediction}" if show_legend else None,  # Add to legend if not added
-                hovertemplate=hover_template,
-                showlegend=show_legend  # Suppress additional legend entries
-            ), row=1, col=1)
-
-            fig.add_trace(go.Scatter(
-                x=raw_data.index[start_idx:end_idx + 1],
-                y=raw_data.iloc[start_idx:end_idx + 1, 1],
-                mode='lines',
-                line=dict(color=color, width=1),
-                name=None,  # No duplicate legend entries for the second column
-                hovertemplate=hover_template,
-                showlegend=False  # Suppress legend
-            ), row=2, col=1)
-
-            added_classes.add(prediction)  # Mark this class as added
-
-    fig.update_layout(
-        title="Data Visualization with Predictions and Bead Numbers",
-        xaxis_title="Index",
-        yaxis_title="NIR Values",
-        xaxis2_title="Index",
-        yaxis2_title="VIS Values",
-        height=700,
-        showlegend=True
-    )
-
-    st.plotly_chart(fig)
+    show_figure(fig)
 
 
 # Streamlit UI
 st.title("NVH Data Classification Model Training Results")
+point_budget = rendering_options()
+show_debug = debug_options()
+focus_margin = bead_focus_options()
 
 # File upload for the folder as ZIP
-uploaded_zip = st.file_uploader("Upload ZIP file containing CSV files", type=["zip"])
+uploaded_zip = server_dataset() or st.file_uploader("Upload ZIP file containing CSV files", type=["zip"])
 
 if uploaded_zip:
     # Extract ZIP and list CSV files inside (including files in subdirectories)
     csv_files = extract_zip_and_list_files(uploaded_zip)
 
     if csv_files:
-        selected_file = st.selectbox("Select CSV File to Plot", csv_files)
+        # Parse every uploaded CSV in the background so file selection is instant (skipped in bead focus)
+        if focus_margin is None:
+            ingest_panel(uploaded_zip, csv_files)
+
+        # Files whose signals or bead windows do not match the metadata are marked in the file list
+        label_file = validation_panel(uploaded_zip, "241113_NVH_metadata.csv")
 
-        # Directly load the summary data from GitHub
-        summary_df = load_summary_data_from_github()
+        selected_file = st.selectbox("Select CSV File to Plot", csv_files, format_func=label_file)
+        # Decode the neighbouring files in the background while this one is on screen
+        if focus_margin is None:
+            prefetch_neighbours(uploaded_zip, csv_files, selected_file)
 
-        # Update class names in the summary dataframe
-        summary_df = update_class_names_in_summary(summary_df)
+        # Load the summary data (bundled copy first, cached and shared across sessions)
+        summary_df = load_metadata("241113_NVH_metadata.csv")
+        unknown_labels_warning(summary_df)
+        bead_index = load_bead_index("241113_NVH_metadata.csv")
+        focus_range = bead_picker(selected_file, bead_index) if focus_margin is not None else None
 
         model_columns = [col for col in summary_df.columns if "_Prediction" in col]
         selected_model = st.selectbox("Select Model for Coloring", model_columns)
 
         if st.button("Plot Data"):
-            # Extract the CSV file from the zip and load it
-            with zipfile.ZipFile(uploaded_zip, 'r') as zip_ref:
-                with zip_ref.open(selected_file) as file:
-                    load_and_plot_csv_with_highlights(file, summary_df, selected_model)
+            # Decode the CSV from the ZIP (cached per ZIP content and member)
+            with timing_session(show_debug, viewer=os.path.basename(__file__), session=session_id(),
+                                file=selected_file, column=selected_model, point_budget=point_budget) as timer:
+                if focus_range is not None:
+                    # Read only the bead's rows plus the margin, via the member's row offset index
+                    signals, x_offset = load_signal_range(uploaded_zip, selected_file, focus_range[0] - focus_margin,
+                                                          focus_range[1] + focus_margin)
+                else:
+                    signals, x_offset = load_signals(uploaded_zip, selected_file), 0
+                load_and_plot_csv_with_highlights(selected_file, signals, bead_index, selected_model, point_budget, x_offset)
+            timing_panel(timer, show_debug)
     else:
         st.warning("No CSV files found in the ZIP file.")
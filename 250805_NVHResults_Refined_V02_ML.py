@@ -1,141 +1,133 @@
 import os
-import zipfile
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import streamlit as st
 
+from nvh.metadata import load_bead_index, load_metadata
+from nvh.plotting import build_signal_figure
+from nvh.pyramid import pyramid_grid
+from nvh.rowindex import load_signal_range
+from nvh.signals import list_signal_members, load_signals, zip_digest
+from nvh.timing import timing_session
+from nvh.ui import (
+    bead_focus_options, bead_picker, class_overlay_panel, debug_options, features_panel, focus_window, ingest_panel,
+    metrics_panel, prefetch_neighbours, rendering_options, server_dataset, session_id, show_figure, spectral_panel,
+    timing_panel, unknown_labels_warning, validation_panel, version_diff_panel, viewer_mode, worst_beads_panel,
+    zoom_range
+)
+
 # Set page layout to wide
 st.set_page_config(layout="wide")
 
-# --- Function: Extract ZIP and list CSV files ---
+# --- Function: List the signal files of a ZIP or server directory ---
 def extract_zip_and_list_files(zip_file):
-    csv_files = []
-    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-        for file in zip_ref.namelist():
-            if file.endswith(".csv"):  # Include CSV files only
-                csv_files.append(file)
-    return csv_files
-
-# --- Function: Load refined summary metadata from GitHub ---
-def load_summary_data_from_github():
-    url = "https://raw.githubusercontent.com/meliaph-monitech/241119_NVH_ModelComparisonResults/refs/heads/main/241113_NVH_metadata_ML.csv"
-    return pd.read_csv(url)
+    # Signal files (CSV, or converted .npy / .parquet) of an uploaded ZIP, a server ZIP or a server directory
+    return list_signal_members(zip_file)
 
 # --- Function: Load and plot CSV with highlights ---
-def load_and_plot_csv_with_highlights(file, summary_df, selected_column):
-    raw_data = pd.read_csv(file)
-
-    # Color map including OK-like
-    class_color_map = {
-        "OK": "red",
-        "OK-like": "orange",
-        "Hot Melt": "blue",
-        "Poor Appearance": "green",
-        "Weak Weld": "purple"
-    }
-
-    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1)
-
-    # Plot raw NIR and VIS baseline
-    fig.add_trace(go.Scatter(
-        x=raw_data.index,
-        y=raw_data.iloc[:, 0],
-        mode='lines',
-        line=dict(color='gray', width=1),
-        name='All Data'
-    ), row=1, col=1)
-
-    fig.add_trace(go.Scatter(
-        x=raw_data.index,
-        y=raw_data.iloc[:, 1],
-        mode='lines',
-        line=dict(color='gray', width=1),
-        name='All Data',
-        showlegend=False
-    ), row=2, col=1)
-
-    # Filter metadata for selected file
-    file_info = summary_df[summary_df["file"] == os.path.basename(file.name)]
-    added_classes = set()
-    prediction_order = ["OK", "OK-like", "Hot Melt", "Poor Appearance", "Weak Weld"]
-
-    # Plot highlights
-    for pred in prediction_order:
-        class_rows = file_info[file_info[selected_column] == pred]
-
-        for _, row in class_rows.iterrows():
-            start_idx = int(row["start_index"])
-            end_idx = int(row["end_index"])
-            prediction = row[selected_column]
-            bead_number = row["bead_number"]
-
-            if pd.isna(prediction):
-                continue
-
-            color = class_color_map.get(prediction, "black")
-            hover_template = f"Bead Number: {bead_number}<br>Class: {prediction}"
-            show_legend = prediction not in added_classes
-
-            # NIR trace
-            fig.add_trace(go.Scatter(
-                x=raw_data.index[start_idx:end_idx + 1],
-                y=raw_data.iloc[start_idx:end_idx + 1, 0],
-                mode='lines',
-                line=dict(color=color, width=1),
-                name=f"Class {prediction}" if show_legend else None,
-                hovertemplate=hover_template,
-                showlegend=show_legend
-            ), row=1, col=1)
-
-            # VIS trace
-            fig.add_trace(go.Scatter(
-                x=raw_data.index[start_idx:end_idx + 1],
-                y=raw_data.iloc[start_idx:end_idx + 1, 1],
-                mode='lines',
-                line=dict(color=color, width=1),
-                name=None,
-                hovertemplate=hover_template,
-                showlegend=False
-            ), row=2, col=1)
-
-            added_classes.add(prediction)
-
-    fig.update_layout(
-        title=f"Bead-Level NVH Visualization ({selected_column})",
-        xaxis_title="Index",
-        yaxis_title="NIR Signal",
-        xaxis2_title="Index",
-        yaxis2_title="VIS Signal",
-        height=700,
-        showlegend=True
-    )
-
-    st.plotly_chart(fig)
+def load_and_plot_csv_with_highlights(file_name, signals, bead_index, selected_column, point_budget=None,
+                                      focus_range=None, x_offset=0, grid=None, chart_key=None, base_key=None):
+    # Gray baseline (cached per view) plus one NaN-separated highlight trace per class and channel
+    fig = build_signal_figure(file_name, signals, bead_index, selected_column, point_budget, x_offset=x_offset,
+                              grid=grid, base_key=base_key)
+
+    # Open zoomed to one bead (worst-beads mode), with some context either side
+    if focus_range is not None:
+        fig.update_xaxes(range=list(focus_window(focus_range, signals.shape[1])))
+
+    show_figure(fig, chart_key)
+
+# --- Fragment: Coloring selector and chart; changing only the coloring reruns just this part ---
+@st.fragment
+def plot_selected_file(uploaded_zip, selected_file, bead_index, label_options, focus_range, focus_margin,
+                       point_budget, show_debug):
+    # Provide choice: refined_label (ground truth) or model predictions
+    selected_column = st.selectbox("Select Label or Model Prediction", label_options)
+
+    with timing_session(show_debug, viewer=os.path.basename(__file__), session=session_id(),
+                        file=selected_file, column=selected_column, point_budget=point_budget) as timer:
+        grid = chart_key = view_range = None
+        if focus_margin is not None and focus_range is not None:
+            # Read only the bead's rows plus the margin, via the member's row offset index
+            signals, x_offset = load_signal_range(uploaded_zip, selected_file, focus_range[0] - focus_margin,
+                                                  focus_range[1] + focus_margin)
+            focus_range = None  # The loaded range is the view
+        else:
+            signals, x_offset = load_signals(uploaded_zip, selected_file), 0
+            if point_budget:
+                # Zoomable view drawn from the min/max pyramid level that fits the visible x-range
+                view_range, chart_key = zoom_range(selected_file, signals.shape[1], focus_range)
+                grid = pyramid_grid(uploaded_zip, selected_file, signals, bead_index, view_range, point_budget)
+                focus_range = None
+        # The gray baseline of this exact view is built once and reused for every coloring column
+        base_key = (zip_digest(uploaded_zip), selected_file, point_budget, x_offset, signals.shape[1], view_range)
+        load_and_plot_csv_with_highlights(selected_file, signals, bead_index, selected_column, point_budget,
+                                          focus_range, x_offset, grid, chart_key, base_key)
+        # Frequency content of the same signal view, per bead
+        spectral_panel(uploaded_zip, selected_file, signals, bead_index, selected_column, x_offset)
+    timing_panel(timer, show_debug, st)
 
 # --- Streamlit UI ---
 st.title("Bead-Level NVH Data Classification Viewer")
+point_budget = rendering_options()
+show_debug = debug_options()
+focus_margin = bead_focus_options()
 
-# File uploader for ZIP
-uploaded_zip = st.file_uploader("Upload ZIP file containing CSV files", type=["zip"])
+# Dataset on the server (when NVH_DATA_ROOT is set) or an uploaded ZIP
+uploaded_zip = server_dataset() or st.file_uploader("Upload ZIP file containing CSV files", type=["zip"])
 
 if uploaded_zip:
     csv_files = extract_zip_and_list_files(uploaded_zip)
 
     if csv_files:
-        selected_file = st.selectbox("Select CSV File to Plot", csv_files)
+        # Parse every uploaded CSV in the background so file selection is instant (skipped in bead focus)
+        if focus_margin is None:
+            ingest_panel(uploaded_zip, csv_files)
+
+        # Files whose signals or bead windows do not match the metadata are marked in the file list
+        label_file = validation_panel(uploaded_zip, "241113_NVH_metadata_ML.csv")
+
+        mode = viewer_mode()
 
         # Load metadata
-        summary_df = load_summary_data_from_github()
+        summary_df = load_metadata("241113_NVH_metadata_ML.csv")
+        unknown_labels_warning(summary_df)
+        bead_index = load_bead_index("241113_NVH_metadata_ML.csv")
+
+        focus_range = None
+        if mode == "Worst beads":
+            # Beads where the models split or disagree with the label, worst first
+            picked = worst_beads_panel("241113_NVH_metadata_ML.csv", csv_files)
+            selected_file, focus_range = picked if picked else (None, None)
+        elif mode == "Version diff":
+            # Beads relabeled or re-predicted since another metadata version
+            picked = version_diff_panel("241113_NVH_metadata_ML.csv", csv_files)
+            selected_file, focus_range = picked if picked else (None, None)
+        elif mode == "Browse files":
+            selected_file = st.selectbox("Select CSV File to Plot", csv_files, format_func=label_file)
+            if focus_margin is not None:
+                focus_range = bead_picker(selected_file, bead_index)
+            else:
+                # Decode the neighbouring files in the background while this one is on screen
+                prefetch_neighbours(uploaded_zip, csv_files, selected_file)
+        else:
+            selected_file = None  # The class overlay spans every file
 
-        # Provide choice: refined_label (ground truth) or model predictions
         model_columns = [col for col in summary_df.columns if "_Prediction" in col]
         label_options = ["refined_label"] + model_columns
-        selected_column = st.selectbox("Select Label or Model Prediction", label_options)
 
-        # Auto-plot whenever selection changes
-        with zipfile.ZipFile(uploaded_zip, 'r') as zip_ref:
-            with zip_ref.open(selected_file) as file:
-                load_and_plot_csv_with_highlights(file, summary_df, selected_column)
+        # Accuracy, per-class scores and confusion matrices for every model
+        metrics_panel("241113_NVH_metadata_ML.csv", summary_df, selected_file)
+
+        # Per-bead signal statistics for every file, for feature-vs-prediction analysis
+        features_panel(uploaded_zip, "241113_NVH_metadata_ML.csv")
+
+        # Auto-plot whenever selection changes (the overlay instead spans every file)
+        if mode == "Class overlay":
+            # Every bead of one class across the ZIP on a common time axis
+            class_overlay_panel(uploaded_zip, "241113_NVH_metadata_ML.csv", label_options)
+        elif selected_file:
+            plot_selected_file(uploaded_zip, selected_file, bead_index, label_options, focus_range, focus_margin,
+                               point_budget, show_debug)
+        else:
+            st.info("Select a bead in the table to open its file.")
     else:
         st.warning("No CSV files found in the uploaded ZIP.")
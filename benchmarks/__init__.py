@@ -0,0 +1 @@
+# Benchmarks for the NVH viewer pipeline (run with: python -m benchmarks.run_benchmarks)
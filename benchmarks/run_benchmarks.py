@@ -0,0 +1,144 @@
+"""Time the load-and-plot pipeline on synthetic NVH data and write a JSON report.
+
+Example:
+    python -m benchmarks.run_benchmarks --samples 10000 1000000 --modes full webgl --report bench_report.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from benchmarks.synthetic import make_synthetic_dataset
+from nvh.metadata import BeadIndex, to_columnar
+from nvh.plotting import build_signal_figure
+from nvh.signals import list_signal_members, parse_signal_csv
+
+
+# --- Function: Run fn `repeat` times; returns (min, median) seconds and the last result ---
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times), result
+
+
+def _read_member(zip_path, member, parse):
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        with zip_ref.open(member) as file:
+            return parse(file)
+
+
+# --- Function: Viewer-style filtering of the summary table for one file (pre-index code path) ---
+def _mask_filter(summary_df, file_name, column):
+    file_info = summary_df[summary_df["file"] == file_name]
+    return [file_info[file_info[column] == pred] for pred in file_info[column].cat.categories]
+
+
+def run_case(samples, args, work_dir):
+    zip_path, metadata_path = make_synthetic_dataset(
+        work_dir, n_files=args.files, samples=samples, beads=args.beads, seed=args.seed
+    )
+    summary_df = to_columnar(pd.read_csv(metadata_path))
+    bead_index = BeadIndex(summary_df)
+    members = list_signal_members(zip_path)
+    member = members[0]
+    file_name = os.path.basename(member)
+    column = args.column
+
+    results = []
+
+    def record(stage, seconds, extra=None, mode=None):
+        best, median = seconds
+        results.append({
+            "samples": samples,
+            "stage": stage,
+            "mode": mode,
+            "min_s": best,
+            "median_s": median,
+            **(extra or {})
+        })
+
+    best, median, _ = timed(lambda: list_signal_members(zip_path), args.repeat)
+    record("zip_listing", (best, median), {"members": len(members)})
+
+    best, median, raw_data = timed(lambda: _read_member(zip_path, member, pd.read_csv), args.repeat)
+    record("csv_parse_pandas", (best, median), {"rows": len(raw_data)})
+
+    best, median, signals = timed(lambda: _read_member(zip_path, member, parse_signal_csv), args.repeat)
+    record("csv_parse_float32", (best, median), {"bytes": int(signals.nbytes)})
+
+    best, median, _ = timed(lambda: _mask_filter(summary_df, file_name, column), args.repeat)
+    record("metadata_filter_mask", (best, median), {"metadata_rows": len(summary_df)})
+
+    best, median, beads = timed(lambda: bead_index.get(file_name), args.repeat)
+    record("metadata_filter_index", (best, median), {"beads": len(beads.bead_number)})
+
+    for mode in args.modes:
+        point_budget = args.point_budget if mode == "webgl" else None
+        best, median, fig = timed(
+            lambda: build_signal_figure(member, signals, bead_index, column, point_budget), args.repeat
+        )
+        points = sum(len(trace.y) for trace in fig.data)
+        record("figure_build", (best, median), {"traces": len(fig.data), "points": points}, mode)
+
+        best, median, payload = timed(fig.to_json, args.repeat)
+        record("figure_serialize", (best, median), {"bytes": len(payload)}, mode)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the NVH load-and-plot pipeline on synthetic data.")
+    parser.add_argument("--samples", type=int, nargs="+", default=[10_000, 1_000_000],
+                        help="samples per CSV (one case per value, e.g. 10000 ... 50000000)")
+    parser.add_argument("--files", type=int, default=4, help="CSV files per synthetic ZIP")
+    parser.add_argument("--beads", type=int, default=20, help="beads per file")
+    parser.add_argument("--column", default="refined_label", help="label/prediction column used for coloring")
+    parser.add_argument("--modes", nargs="+", default=["full", "webgl"], choices=["full", "webgl"],
+                        help="rendering modes for figure construction")
+    parser.add_argument("--point-budget", type=int, default=50_000, help="point budget for the webgl mode")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", help="where synthetic data is written (default: a temporary directory)")
+    parser.add_argument("--report", default="bench_report.json", help="JSON report path")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="nvh-bench-") as tmp_dir:
+        work_dir = args.work_dir or tmp_dir
+        results = []
+        for samples in args.samples:
+            for row in run_case(samples, args, work_dir):
+                results.append(row)
+                print(f"{row['samples']:>10} {row['stage']:<22} {row['mode'] or '':<6} "
+                      f"{row['median_s'] * 1000:10.2f} ms", file=sys.stderr)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "plotly": plotly.__version__
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("report", "work_dir")},
+        "results": results
+    }
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from nvh.labels import CLASSES
+
+# Same column order as 241113_NVH_metadata_v03_Robust.csv
+MODEL_NAMES = [
+    "Random Forest",
+    "HistGradientBoosting",
+    "Logistic Regression",
+    "SVM",
+    "XGBoost",
+    "KNN",
+    "Neural Network"
+]
+DEFAULT_LABEL_MIX = {"OK": 0.45, "OK-like": 0.2, "Hot Melt": 0.1, "Poor Appearance": 0.05, "Weak Weld": 0.2}
+
+# Typical bead window (samples) and class-dependent signal offset
+BEAD_LENGTH = (3300, 4000)
+CLASS_OFFSET = {"OK": 1.0, "OK-like": 0.9, "Hot Melt": 1.6, "Poor Appearance": 0.6, "Weak Weld": 0.4}
+
+CHUNK_ROWS = 1_000_000
+
+
+# --- Function: Evenly spaced bead windows that fit inside a recording ---
+def bead_windows(samples, beads, rng):
+    beads = max(min(beads, samples // (BEAD_LENGTH[0] + 1)), 1)
+    slot = samples // beads
+    lengths = rng.integers(BEAD_LENGTH[0], BEAD_LENGTH[1] + 1, size=beads)
+    lengths = np.minimum(lengths, slot - 1)
+    starts = np.arange(beads) * slot + rng.integers(0, np.maximum(slot - lengths, 1))
+    return starts, starts + lengths - 1
+
+
+# --- Function: Two-column NIR/VIS signal with raised segments inside the bead windows ---
+def synthetic_signal(samples, starts, ends, labels, rng):
+    nir = rng.normal(0.0, 0.05, samples).astype(np.float32)
+    vis = rng.normal(0.0, 0.05, samples).astype(np.float32)
+    offsets = np.array([CLASS_OFFSET[label] for label in labels], dtype=np.float32)
+
+    # Per-sample offset via a difference array over the bead windows
+    step = np.zeros(samples + 1, dtype=np.float32)
+    np.add.at(step, starts, offsets)
+    np.add.at(step, ends + 1, -offsets)
+    level = np.cumsum(step[:-1])
+    nir += level
+    vis += 0.5 * level
+    return nir, vis
+
+
+def _write_signal_csv(handle, nir, vis):
+    text = io.TextIOWrapper(handle, encoding="utf-8", newline="")
+    for lo in range(0, len(nir), CHUNK_ROWS):
+        chunk = pd.DataFrame({"NIR": nir[lo:lo + CHUNK_ROWS], "VIS": vis[lo:lo + CHUNK_ROWS]})
+        chunk.to_csv(text, header=lo == 0, index=False, float_format="%.5f")
+    text.flush()
+    text.detach()
+
+
+# --- Function: Labels and noisy model predictions for a batch of beads ---
+def synthetic_labels(n_beads, label_mix, rng, test_fraction=0.5, model_accuracy=0.7):
+    classes = list(label_mix)
+    weights = np.array([label_mix[c] for c in classes], dtype=np.float64)
+    refined = rng.choice(classes, size=n_beads, p=weights / weights.sum())
+    original = np.where(refined == "OK-like", "OK", refined)
+
+    is_test = rng.random(n_beads) < test_fraction
+    predictions = {}
+    predictable = [c for c in CLASSES if c != "OK-like"]
+    for model in MODEL_NAMES:
+        guess = rng.choice(predictable, size=n_beads)
+        correct = rng.random(n_beads) < model_accuracy
+        predicted = np.where(correct, original, guess).astype(object)
+        predicted[~is_test] = None
+        predictions[f"{model}_Prediction"] = predicted
+    return original, refined, predictions
+
+
+# --- Function: Write a synthetic NVH ZIP plus matching v03_Robust-style metadata ---
+# Returns (zip_path, metadata_path).
+def make_synthetic_dataset(out_dir, n_files=4, samples=100_000, beads=20, label_mix=None, seed=0,
+                           compression=zipfile.ZIP_DEFLATED):
+    rng = np.random.default_rng(seed)
+    label_mix = label_mix or DEFAULT_LABEL_MIX
+    os.makedirs(out_dir, exist_ok=True)
+    zip_path = os.path.join(out_dir, f"synthetic_{n_files}x{samples}.zip")
+    metadata_path = os.path.join(out_dir, f"synthetic_{n_files}x{samples}_metadata_v03_Robust.csv")
+
+    tables = []
+    with zipfile.ZipFile(zip_path, "w", compression) as zip_ref:
+        for i in range(n_files):
+            file_name = f"{i:06d}_SYNTH{seed:04d}.csv"
+            starts, ends = bead_windows(samples, beads, rng)
+            original, refined, predictions = synthetic_labels(len(starts), label_mix, rng)
+            nir, vis = synthetic_signal(samples, starts, ends, refined, rng)
+            with zip_ref.open(f"synthetic/{file_name}", "w", force_zip64=True) as handle:
+                _write_signal_csv(handle, nir, vis)
+
+            tables.append(pd.DataFrame({
+                "file": file_name,
+                "bead_number": np.arange(1, len(starts) + 1),
+                "start_index": starts,
+                "end_index": ends,
+                "original_file_label": original,
+                "refined_label": refined,
+                **predictions
+            }))
+
+    pd.concat(tables, ignore_index=True).to_csv(metadata_path, index=False)
+    return zip_path, metadata_path
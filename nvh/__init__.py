@@ -0,0 +1 @@
+# Shared helpers for the NVH model comparison viewers
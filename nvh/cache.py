@@ -0,0 +1,231 @@
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Ceiling on everything the process-wide caches hold together; each cache keeps its own limit too
+CACHE_MEMORY_MB = int(os.environ.get("NVH_CACHE_MEMORY_MB", "2048"))
+
+
+# --- Function: Bytes held by a cached value (DataFrames, bytes, anything with .nbytes, or tuples/dicts of those) ---
+def sizeof(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(sizeof(item) for item in value.values())
+    if isinstance(value, tuple):
+        return sum(sizeof(item) for item in value)
+    return int(value.nbytes)
+
+
+# --- Class: Memory ceiling shared by every registered cache in the process ---
+# Over the ceiling, each cache offers its least recently used entry and the one with the largest
+# idle seconds x bytes is dropped, so big cold entries go before small recently used ones.
+class MemoryBudget:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._caches = []
+        self._lock = threading.Lock()
+
+    def register(self, cache):
+        with self._lock:
+            self._caches.append(cache)
+
+    @property
+    def used_bytes(self):
+        return sum(cache.used_bytes for cache in self._caches)
+
+    def enforce(self):
+        with self._lock:
+            while self.used_bytes > self.max_bytes:
+                now = time.monotonic()
+                victim, worst = None, -1.0
+                for cache in self._caches:
+                    oldest = cache.oldest()
+                    if oldest is None:
+                        continue
+                    key, nbytes, last_used = oldest
+                    score = (now - last_used + 1e-3) * nbytes
+                    if score > worst:
+                        victim, worst = (cache, key), score
+                if victim is None:
+                    return
+                victim[0].evict(victim[1])
+
+    # --- One row per cache plus a total: entries, memory, hit rate and evictions ---
+    def stats(self):
+        rows = [cache.stats() for cache in self._caches]
+        hits, misses = sum(row["hits"] for row in rows), sum(row["misses"] for row in rows)
+        rows.append({
+            "cache": "total",
+            "entries": sum(row["entries"] for row in rows),
+            "used_mb": round(self.used_bytes / (1 << 20), 1),
+            "max_mb": round(self.max_bytes / (1 << 20), 1),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "evictions": sum(row["evictions"] for row in rows)
+        })
+        return pd.DataFrame(rows)
+
+
+memory_budget = MemoryBudget(CACHE_MEMORY_MB << 20)
+
+
+# --- Class: Thread-safe memo of small values (digests, jobs) keeping the max_entries most recently used ---
+class BoundedMemo:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# --- Class: One lock per cache key, so concurrent misses on the same key compute the value once ---
+# Locks are dropped as soon as no caller holds one, so the table stays as small as the work in flight.
+class KeyLocks:
+    def __init__(self):
+        self._locks = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+
+# --- Class: LRU cache of sized values (see sizeof) with a byte budget ---
+# Every cache also counts against the shared memory_budget, so all of them together stay under its ceiling.
+# With a spill_dir, values (decoded signal arrays) are also written to it as .npy and memory-mapped back.
+class LRUCache:
+    def __init__(self, max_bytes, name, spill_dir=None, budget=memory_budget):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.name = name
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, bytes, last used)
+        self._lock = threading.Lock()
+        self._budget = budget
+        if budget is not None:
+            budget.register(self)
+
+    # Spill file for a key; other per-signal data (e.g. pyramids) is stored alongside with its own suffix
+    def spill_path(self, key, suffix=".npy"):
+        digest, member = key
+        name = hashlib.sha1(f"{digest}/{member}".encode()).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}{suffix}")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], entry[1], time.monotonic())
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        if self.spill_dir:
+            path = self.spill_path(key)
+            if os.path.exists(path):
+                self.hits += 1
+                return np.load(path, mmap_mode="r")
+        self.misses += 1
+        return None
+
+    # In-memory entry without touching the LRU order or hit/miss counters
+    def peek(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key, value):
+        # Memory-mapped signals already live in the OS page cache, shared by every session
+        if isinstance(value, np.memmap):
+            return
+        if self.spill_dir:
+            self._spill(key, value)
+        nbytes = sizeof(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.used_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes, time.monotonic())
+            self.used_bytes += nbytes
+            while self.used_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.used_bytes -= evicted[1]
+                self.evictions += 1
+        # Outside this cache's lock: the budget may evict from any cache, including this one
+        if self._budget is not None:
+            self._budget.enforce()
+
+    # (key, bytes, last used) of the least recently used entry, or None when empty
+    def oldest(self):
+        with self._lock:
+            if not self._entries:
+                return None
+            key, (_, nbytes, last_used) = next(iter(self._entries.items()))
+            return key, nbytes, last_used
+
+    def evict(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.used_bytes -= entry[1]
+                self.evictions += 1
+
+    def _spill(self, key, signals):
+        path = self.spill_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, signals)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # Disk full or read-only, keep the in-memory copy only
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "cache": self.name,
+            "entries": len(self._entries),
+            "used_mb": round(self.used_bytes / (1 << 20), 1),
+            "max_mb": round(self.max_bytes / (1 << 20), 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
@@ -0,0 +1,73 @@
+"""Convert every signal CSV in a ZIP (or directory) to float32 .npy files for a server data root.
+
+The .npy files hold a (2, n) NIR/VIS array and keep the member's path with a .npy suffix, so
+the viewers memory-map them instead of parsing CSV text and the metadata still matches by name.
+
+Example:
+    python -m nvh.convert shift.zip /srv/nvh/shift
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from nvh.ingest import parse_member
+from nvh.signals import list_signal_members
+
+_options = None
+
+
+def _init_worker(options):
+    global _options
+    _options = options
+
+
+def npy_path(out_dir, member):
+    return os.path.join(out_dir, *f"{os.path.splitext(member)[0]}.npy".split("/"))
+
+
+# --- Function: Parse one CSV member and write it as .npy (runs in a worker) ---
+def convert_member(member):
+    path = npy_path(_options["out_dir"], member)
+    if os.path.exists(path) and not _options["overwrite"]:
+        return member, False
+    signals = parse_member(_options["source"], member)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(signals, dtype=np.float32))
+    os.replace(tmp_path, path)
+    return member, True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert signal CSVs to memory-mappable .npy files.")
+    parser.add_argument("source", help="ZIP file or directory containing the signal CSVs")
+    parser.add_argument("out_dir", help="directory to write the .npy files to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--overwrite", action="store_true", help="rewrite .npy files that already exist")
+    args = parser.parse_args(argv)
+
+    members = [member for member in list_signal_members(args.source) if member.lower().endswith(".csv")]
+    options = {"source": os.path.abspath(args.source), "out_dir": args.out_dir, "overwrite": args.overwrite}
+
+    written, errors = 0, {}
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(options,)) as executor:
+        futures = {executor.submit(convert_member, member): member for member in members}
+        for done, future in enumerate(as_completed(futures), start=1):
+            member = futures[future]
+            try:
+                written += future.result()[1]
+            except Exception as exc:
+                errors[member] = str(exc)
+            print(f"[{done}/{len(members)}] {member}", file=sys.stderr)
+
+    print(f"{written} files written, {len(members) - written - len(errors)} up to date, "
+          f"{len(errors)} failed -> {args.out_dir}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import threading
+import time
+
+from nvh.signals import SIGNAL_SUFFIXES
+
+# Server directories the viewers may read from (os.pathsep-separated); unset means upload only
+DATA_ROOTS = [os.path.abspath(root) for root in os.environ.get("NVH_DATA_ROOT", "").split(os.pathsep) if root]
+
+# Seconds a dataset listing is reused before the roots are scanned again
+DATASET_SCAN_TTL = float(os.environ.get("NVH_DATASET_SCAN_TTL", "30"))
+
+_listing = {}
+_listing_lock = threading.Lock()
+
+
+# --- Function: Datasets under the data roots: ZIP files and directories holding signal files ---
+# Returns {label: path} with labels relative to their root (prefixed by the root when there are several).
+def list_datasets(roots=None):
+    roots = DATA_ROOTS if roots is None else roots
+    key = tuple(roots)
+    with _listing_lock:
+        cached = _listing.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+    datasets = {}
+    for root in roots:
+        prefix = f"{os.path.basename(root)}/" if len(roots) > 1 else ""
+        for folder, subfolders, files in os.walk(root):
+            subfolders.sort()
+            relative = os.path.relpath(folder, root).replace(os.sep, "/")
+            if any(name.lower().endswith(SIGNAL_SUFFIXES) for name in files):
+                datasets[prefix + ("." if relative == "." else relative + "/")] = folder
+            for name in sorted(files):
+                if name.lower().endswith(".zip"):
+                    datasets[prefix + os.path.join(relative, name).replace(os.sep, "/").removeprefix("./")] = (
+                        os.path.join(folder, name)
+                    )
+
+    with _listing_lock:
+        _listing[key] = (time.monotonic() + DATASET_SCAN_TTL, datasets)
+    return datasets
+
+
+# --- Function: Whether path lies inside one of the data roots ---
+def within_roots(path, roots=None):
+    path = os.path.realpath(path)
+    for root in DATA_ROOTS if roots is None else roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath([root, path]) == root:
+            return True
+    return False
@@ -0,0 +1,168 @@
+"""Differences between two metadata versions, bead by bead.
+
+Example:
+    python -m nvh.diff 241113_NVH_metadata_ML.csv 241113_NVH_metadata_v03_Robust.csv --out changes.csv
+"""
+import argparse
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from nvh.cache import KeyLocks
+from nvh.labels import CLASSES, label_codes, label_columns, prediction_columns
+from nvh.metadata import load_metadata, metadata_cache, metadata_version
+
+# Metadata versions shipped with the viewers, oldest first
+METADATA_VERSIONS = [
+    "241113_NVH_metadata.csv",
+    "241113_NVH_metadata_refined.csv",
+    "241113_NVH_metadata_ML.csv",
+    "241113_NVH_metadata_v03_Robust.csv"
+]
+
+# beads: one row per matched bead with any change; columns: one row per label/prediction column;
+# counts: matched / left-only / right-only bead totals
+MetadataDiff = namedtuple("MetadataDiff", ["beads", "columns", "counts"])
+
+_key_lock = KeyLocks()
+
+
+# --- Function: int64 (file, bead_number) keys on a file-name categories index shared by both tables ---
+def _bead_keys(summary_df, categories):
+    file = summary_df["file"]
+    file_codes = categories.get_indexer(file.cat.categories)[file.cat.codes.to_numpy()]
+    return (file_codes.astype(np.int64) << 32) | summary_df["bead_number"].to_numpy(dtype=np.int64)
+
+
+# --- Function: Row positions of the beads present in both tables (sort the right keys, binary-search the left) ---
+def join_beads(left_df, right_df):
+    categories = left_df["file"].cat.categories.union(right_df["file"].cat.categories)
+    left_keys, right_keys = _bead_keys(left_df, categories), _bead_keys(right_df, categories)
+    order = np.argsort(right_keys, kind="stable")
+    sorted_keys = right_keys[order]
+    positions = np.minimum(np.searchsorted(sorted_keys, left_keys), max(len(sorted_keys) - 1, 0))
+    matched = sorted_keys[positions] == left_keys if len(sorted_keys) else np.zeros(len(left_keys), dtype=bool)
+    return np.flatnonzero(matched), order[positions[matched]]
+
+
+# --- Function: Accuracy of one prediction column on the given rows, against reference or its _Correct column ---
+def _accuracy(summary_df, rows, column, reference):
+    if column not in summary_df.columns:
+        return np.nan
+    if reference in summary_df.columns:
+        truth = label_codes(summary_df[reference])[rows]
+        predicted = label_codes(summary_df[column])[rows]
+        scored = (truth >= 0) & (predicted >= 0)
+        return (truth[scored] == predicted[scored]).mean() if scored.any() else np.nan
+    correct = f"{column.removesuffix('_Prediction')}_Correct"
+    if correct in summary_df.columns:
+        values = summary_df[correct].to_numpy(dtype="float64", na_value=np.nan)[rows]
+        return np.nanmean(values) if (~np.isnan(values)).any() else np.nan
+    return np.nan
+
+
+def _class_names(codes):
+    # Code -1 (missing) picks the trailing None
+    return np.array(CLASSES + [None], dtype=object)[codes]
+
+
+# --- Function: Relabeled beads, changed predictions per model and accuracy deltas between two tables ---
+# Only beads present in both tables are compared; accuracies are on those beads, each side against its own reference.
+def diff_metadata(left_df, right_df, reference="refined_label"):
+    left_rows, right_rows = join_beads(left_df, right_df)
+    columns = list(dict.fromkeys(label_columns(left_df) + label_columns(right_df)))
+    predictions = set(prediction_columns(left_df)) | set(prediction_columns(right_df))
+
+    changed = {}
+    column_rows = []
+    for col in columns:
+        both = col in left_df.columns and col in right_df.columns
+        before = label_codes(left_df[col])[left_rows] if col in left_df.columns else None
+        after = label_codes(right_df[col])[right_rows] if col in right_df.columns else None
+        if both:
+            changed[col] = before != after
+        column_rows.append({
+            "column": col,
+            "in_left": col in left_df.columns,
+            "in_right": col in right_df.columns,
+            "compared": int(((before >= 0) & (after >= 0)).sum()) if both else 0,
+            "changed": int(((before != after) & (before >= 0) & (after >= 0)).sum()) if both else 0,
+            "now_missing": int(((before >= 0) & (after < 0)).sum()) if both else 0,
+            "now_present": int(((before < 0) & (after >= 0)).sum()) if both else 0,
+            "left_accuracy": _accuracy(left_df, left_rows, col, reference) if col in predictions else np.nan,
+            "right_accuracy": _accuracy(right_df, right_rows, col, reference) if col in predictions else np.nan
+        })
+    column_table = pd.DataFrame(column_rows)
+    column_table["accuracy_delta"] = column_table["right_accuracy"] - column_table["left_accuracy"]
+
+    # Changed columns per bead as a bitmask, expanded to names once per distinct mask
+    names = list(changed)
+    masks = np.zeros(len(left_rows), dtype=np.int64)
+    for bit, col in enumerate(names):
+        masks |= changed[col].astype(np.int64) << bit
+    bounds_changed = (
+        (left_df["start_index"].to_numpy()[left_rows] != right_df["start_index"].to_numpy()[right_rows])
+        | (left_df["end_index"].to_numpy()[left_rows] != right_df["end_index"].to_numpy()[right_rows])
+    )
+    keep = np.flatnonzero((masks != 0) | bounds_changed)
+    distinct, inverse = np.unique(masks[keep], return_inverse=True)
+    labels = np.array([", ".join(col for bit, col in enumerate(names) if mask >> bit & 1) for mask in distinct],
+                      dtype=object)
+
+    rows = right_rows[keep]
+    has_reference = reference in left_df.columns and reference in right_df.columns
+    beads = pd.DataFrame({
+        "file": right_df["file"].to_numpy()[rows],
+        "bead_number": right_df["bead_number"].to_numpy()[rows],
+        "start_index": right_df["start_index"].to_numpy()[rows],
+        "end_index": right_df["end_index"].to_numpy()[rows],
+        "relabeled": changed[reference][keep] if has_reference else np.zeros(len(keep), dtype=bool),
+        "label_before": _class_names(label_codes(left_df[reference])[left_rows[keep]]) if has_reference else None,
+        "label_after": _class_names(label_codes(right_df[reference])[rows]) if has_reference else None,
+        "predictions_changed": sum(changed[col][keep].astype(np.int64) for col in names if col in predictions),
+        "bounds_changed": bounds_changed[keep],
+        "changed_columns": labels[inverse.reshape(-1)]
+    })
+    beads = beads.sort_values(["relabeled", "predictions_changed"], ascending=False, kind="stable")
+    counts = pd.Series({
+        "matched": len(left_rows),
+        "left_only": len(left_df) - len(left_rows),
+        "right_only": len(right_df) - len(right_rows)
+    })
+    return MetadataDiff(beads.reset_index(drop=True), column_table, counts)
+
+
+# --- Function: Diff of two metadata tables by name, cached per pair of metadata versions ---
+def load_diff(left_name, right_name, reference="refined_label"):
+    key = ("diff", metadata_version(left_name), metadata_version(right_name), reference)
+    result = metadata_cache.get(key)
+    if result is None:
+        with _key_lock(key):
+            result = metadata_cache.peek(key)
+            if result is None:
+                result = diff_metadata(load_metadata(left_name), load_metadata(right_name), reference)
+                metadata_cache.put(key, result)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List beads whose label, predictions or bounds differ between "
+                                                 "two metadata versions.")
+    parser.add_argument("left", help="older metadata CSV name")
+    parser.add_argument("right", help="newer metadata CSV name")
+    parser.add_argument("--reference", default="refined_label", help="label column used for relabels and accuracy")
+    parser.add_argument("--out", help="write the changed beads to this CSV")
+    args = parser.parse_args(argv)
+
+    result = diff_metadata(load_metadata(args.left), load_metadata(args.right), args.reference)
+    print(result.counts.to_string(), file=sys.stderr)
+    print(result.columns.to_string(index=False), file=sys.stderr)
+    if args.out:
+        result.beads.to_csv(args.out, index=False)
+        print(f"{len(result.beads)} changed beads -> {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import numpy as np
+
+
+# --- Function: Sample positions to draw for a point budget (min/max per bucket) ---
+# Every channel keeps its min and max in each bucket, and all anchors (bead start/end
+# indices) are bucket edges, so highlights cut from the same grid line up exactly.
+def minmax_grid(channels, point_budget, anchors=()):
+    length = len(channels[0])
+    if length <= point_budget:
+        return np.arange(length)
+
+    n_buckets = max(point_budget // (2 * len(channels) + 1), 1)
+    anchors = np.asarray(anchors, dtype=np.int64)
+    edges = np.concatenate((
+        np.linspace(0, length, n_buckets + 1).astype(np.int64),
+        anchors,
+        anchors + 1
+    ))
+    edges = np.unique(np.clip(edges, 0, length))
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    bucket = np.repeat(np.arange(starts.size), sizes)
+
+    keep = [starts, [length - 1]]
+    for signal in channels:
+        signal = np.asarray(signal)
+        for reduce in (np.minimum, np.maximum):
+            extreme = reduce.reduceat(signal, starts)
+            hits = np.flatnonzero(signal == extreme[bucket])
+            # First hit per bucket; buckets with NaN have no hit and keep only their edge
+            _, first = np.unique(bucket[hits], return_index=True)
+            keep.append(hits[first])
+    return np.unique(np.concatenate(keep))
+
+
+# --- Function: Anchors for a file's beads (window start and end indices) ---
+def bead_anchors(beads):
+    return np.concatenate((beads.start_index, beads.end_index))
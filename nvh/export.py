@@ -0,0 +1,224 @@
+"""Export every labeled bead's NIR/VIS window in a ZIP (or directory) to a Parquet training dataset.
+
+Each row is one bead: file, bead_number, start/end index, the label and prediction columns as class
+names, and the bead's nir/vis samples as float32 lists (Parquet stores them as one values array plus
+offsets). Every run appends one part file and skips files already in the dataset, so new ZIPs can be
+exported into the same directory as they arrive.
+
+Example:
+    python -m nvh.export shift.zip /srv/nvh/beads --metadata 241113_NVH_metadata_v03_Robust.csv
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from nvh.ingest import parse_member
+from nvh.labels import CLASSES
+from nvh.metadata import load_bead_index, metadata_version
+from nvh.signals import list_signal_members, metadata_file_name, zip_digest
+
+# Bump when the row layout changes; older datasets are then refused instead of mixed
+EXPORT_FORMAT_VERSION = 1
+
+# Bead samples buffered before a row group is written, which bounds the writer's memory
+EXPORT_ROW_GROUP_MB = int(os.environ.get("NVH_EXPORT_ROW_GROUP_MB", "64"))
+
+# Dataset settings and the log of appended parts; the leading underscore keeps Parquet readers off it
+MANIFEST_NAME = "_dataset.json"
+
+_options = None
+
+
+def _init_worker(options):
+    global _options
+    _options = options
+
+
+# --- Function: Every [start, end] window of a (2, n) signal gathered back to back ---
+# Returns (kept mask, offsets, nir values, vis values); windows not fully inside the signal are dropped.
+def bead_segments(signals, starts, ends):
+    length = signals.shape[1]
+    keep = (starts >= 0) & (ends < length) & (ends >= starts)
+    starts, lengths = starts[keep], (ends - starts + 1)[keep]
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    index = starts[owner] + np.arange(offsets[-1]) - offsets[:-1][owner]
+    return keep, offsets, signals[0, index], signals[1, index]
+
+
+def export_schema(label_columns):
+    classes = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema(
+        [("source", pa.string()), ("file", pa.string()), ("bead_number", pa.int64()),
+         ("start_index", pa.int64()), ("end_index", pa.int64())]
+        + [(col, classes) for col in label_columns]
+        + [("nir", pa.large_list(pa.float32())), ("vis", pa.large_list(pa.float32()))]
+    )
+
+
+# --- Function: Parse one member and cut its beads into a record batch (runs in a worker) ---
+def export_member(member, beads):
+    signals = parse_member(_options["source"], member)
+    keep, offsets, nir, vis = bead_segments(signals, beads.start_index, beads.end_index)
+    rows = int(keep.sum())
+    offsets = pa.array(offsets, type=pa.int64())
+    dictionary = pa.array(CLASSES)
+    columns = [
+        pa.array([_options["source_name"]] * rows, type=pa.string()),
+        pa.array([metadata_file_name(member)] * rows, type=pa.string()),
+        pa.array(beads.bead_number[keep], type=pa.int64()),
+        pa.array(beads.start_index[keep], type=pa.int64()),
+        pa.array(beads.end_index[keep], type=pa.int64())
+    ]
+    for col in _options["label_columns"]:
+        codes = beads.codes[col][keep]
+        columns.append(pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0, type=pa.int8()), dictionary))
+    columns.append(pa.LargeListArray.from_arrays(offsets, pa.array(nir, type=pa.float32())))
+    columns.append(pa.LargeListArray.from_arrays(offsets, pa.array(vis, type=pa.float32())))
+    return pa.RecordBatch.from_arrays(columns, schema=export_schema(_options["label_columns"])), len(keep) - rows
+
+
+# --- Function: Results of fn over jobs in submission order, with at most `ahead` jobs in flight ---
+# Yields (job, future); parsed files wait in the queue only until the writer takes them.
+def _stream(executor, fn, jobs, ahead):
+    pending = deque()
+    for job in jobs:
+        pending.append((job, executor.submit(fn, *job)))
+        if len(pending) >= ahead:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def _write_row_group(writer, batches, schema):
+    table = pa.Table.from_batches(batches, schema)
+    writer.write_table(table, row_group_size=table.num_rows)
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# --- Function: File names already in the dataset, read from the parts themselves ---
+# A part is only renamed into place once complete, so an interrupted run leaves its files to the next one.
+def exported_files(out_dir):
+    files = set()
+    for name in sorted(os.listdir(out_dir)) if os.path.isdir(out_dir) else []:
+        if name.startswith("part-") and name.endswith(".parquet"):
+            files.update(pq.read_table(os.path.join(out_dir, name), columns=["file"])["file"].unique().to_pylist())
+    return files
+
+
+# --- Function: The exported beads as one Arrow table (nir/vis as list columns) ---
+def load_dataset(out_dir, columns=None):
+    return pq.read_table(out_dir, columns=columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append every labeled bead's signal window to a Parquet dataset.")
+    parser.add_argument("source", help="ZIP file or directory containing the signal files (CSV, .npy, .parquet)")
+    parser.add_argument("out_dir", help="dataset directory (created, or appended to)")
+    parser.add_argument("--metadata", default="241113_NVH_metadata_v03_Robust.csv", help="metadata CSV name")
+    parser.add_argument("--metadata-path", help="explicit path to the metadata CSV")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    bead_index = load_bead_index(args.metadata, args.metadata_path)
+    version = metadata_version(args.metadata, args.metadata_path)
+    manifest = read_manifest(args.out_dir) or {
+        "format_version": EXPORT_FORMAT_VERSION,
+        "metadata": args.metadata,
+        "metadata_version": version,
+        "label_columns": bead_index.columns,
+        "parts": []
+    }
+    if manifest["format_version"] != EXPORT_FORMAT_VERSION or manifest["metadata_version"] != version:
+        parser.error(f"{args.out_dir} was exported with {manifest['metadata']} (format "
+                     f"{manifest['format_version']}); export this metadata version to a new directory")
+
+    exported = exported_files(args.out_dir)
+    jobs, unlabeled = [], 0
+    for member in list_signal_members(args.source):
+        if metadata_file_name(member) in exported:
+            continue
+        beads = bead_index.get(metadata_file_name(member))
+        if not len(beads.bead_number):
+            unlabeled += 1
+            continue
+        jobs.append((member, beads))
+    print(f"{len(jobs)} files to export, {len(exported)} already in the dataset, {unlabeled} not in the metadata",
+          file=sys.stderr)
+    if not jobs:
+        return 0
+
+    source_name = os.path.basename(os.path.normpath(args.source))
+    digest = zip_digest(args.source)
+    part = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{digest[:12]}.parquet"
+    path = os.path.join(args.out_dir, part)
+    tmp_path = os.path.join(args.out_dir, f"_{part}.{os.getpid()}.tmp")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    options = {"source": os.path.abspath(args.source), "source_name": source_name,
+               "label_columns": manifest["label_columns"]}
+    schema = export_schema(manifest["label_columns"])
+    files, beads_written, skipped, errors = 0, 0, 0, {}
+    buffered, buffered_bytes = [], 0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(options,)) as executor, \
+            pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+        for done_count, ((member, _), future) in enumerate(
+                _stream(executor, export_member, jobs, 2 * args.workers), start=1):
+            try:
+                batch, dropped = future.result()
+            except Exception as exc:
+                errors[member] = str(exc)
+                print(f"[{done_count}/{len(jobs)}] {member}: {exc}", file=sys.stderr)
+                continue
+            files += 1
+            beads_written += batch.num_rows
+            skipped += dropped
+            buffered.append(batch)
+            buffered_bytes += batch.nbytes
+            if buffered_bytes >= EXPORT_ROW_GROUP_MB << 20:
+                _write_row_group(writer, buffered, schema)
+                buffered, buffered_bytes = [], 0
+            print(f"[{done_count}/{len(jobs)}] {member}", file=sys.stderr)
+        if buffered:
+            _write_row_group(writer, buffered, schema)
+
+    if files:
+        os.replace(tmp_path, path)
+        manifest["parts"].append({
+            "part": part, "source": source_name, "source_digest": digest, "files": files,
+            "beads": beads_written, "skipped_beads": skipped, "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        })
+        _write_manifest(args.out_dir, manifest)
+    else:
+        os.remove(tmp_path)
+
+    print(f"{beads_written} beads from {files} files -> {path if files else args.out_dir} "
+          f"({skipped} beads outside their signal skipped, {len(errors)} files failed)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""Per-bead NIR/VIS signal statistics for every file in a ZIP.
+
+Example:
+    python -m nvh.features shift.zip --metadata 241113_NVH_metadata_v03_Robust.csv --out features.parquet
+"""
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from nvh.ingest import INGEST_WORKERS, cached_member, parse_member
+from nvh.labels import label_columns
+from nvh.metadata import CACHE_DIR, load_bead_index, load_metadata, metadata_version
+from nvh.signals import list_signal_members, metadata_file_name, shared_zip_source, zip_digest
+
+# Bump when feature definitions change so cached tables are rebuilt
+FEATURE_VERSION = 1
+
+CHANNELS = ["nir", "vis"]
+PERCENTILES = [5, 50, 95]
+# FFT bands as fractions of the Nyquist frequency (the recordings carry no sample rate)
+FFT_BANDS = [(0.0, 0.05), (0.05, 0.15), (0.15, 0.4), (0.4, 1.0)]
+
+
+def feature_names():
+    names = ["mean", "rms", "p2p"] + [f"p{q:02d}" for q in PERCENTILES] + ["slope"]
+    return names + [f"band{i}" for i in range(len(FFT_BANDS))]
+
+
+def feature_columns():
+    return [f"{channel}_{name}" for channel in CHANNELS for name in feature_names()]
+
+
+# --- Function: Statistics of every [start, end] segment of one signal, without a per-bead loop ---
+def segment_features(signal, starts, ends):
+    length = len(signal)
+    starts = np.clip(np.asarray(starts, dtype=np.int64), 0, length)
+    ends = np.clip(np.asarray(ends, dtype=np.int64), -1, length - 1)
+    lengths = np.maximum(ends - starts + 1, 0)
+    result = {name: np.full(len(starts), np.nan) for name in feature_names()}
+
+    keep = np.flatnonzero(lengths > 0)
+    if keep.size == 0:
+        return result
+    starts, lengths = starts[keep], lengths[keep]
+
+    # Gather all segments back to back; offsets mark where each one begins
+    offsets = np.cumsum(lengths) - lengths
+    owner = np.repeat(np.arange(keep.size), lengths)
+    t = np.arange(owner.size) - offsets[owner]
+    values = signal[starts[owner] + t].astype(np.float64)
+    n = lengths.astype(np.float64)
+
+    total = np.add.reduceat(values, offsets)
+    mean = total / n
+    result["mean"][keep] = mean
+    result["rms"][keep] = np.sqrt(np.add.reduceat(values * values, offsets) / n)
+    result["p2p"][keep] = np.maximum.reduceat(values, offsets) - np.minimum.reduceat(values, offsets)
+
+    # Percentiles: sort within segments once, then interpolate at each segment's ranks
+    ordered = values[np.lexsort((values, owner))]
+    for q in PERCENTILES:
+        rank = (q / 100.0) * (n - 1)
+        low = np.floor(rank).astype(np.int64)
+        high = np.minimum(low + 1, lengths - 1)
+        frac = rank - low
+        result[f"p{q:02d}"][keep] = ordered[offsets + low] * (1 - frac) + ordered[offsets + high] * frac
+
+    # Least-squares slope against the sample index within the bead
+    sum_t = n * (n - 1) / 2
+    sum_tt = (n - 1) * n * (2 * n - 1) / 6
+    sum_ty = np.add.reduceat(t * values, offsets)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result["slope"][keep] = (sum_ty - sum_t * mean) / (sum_tt - sum_t * sum_t / n)
+
+    # Band energies from one batched FFT over zero-padded, mean-removed beads
+    n_fft = 1 << int(lengths.max() - 1).bit_length()
+    t_fft = t < n_fft
+    frames = np.zeros((keep.size, n_fft))
+    frames[owner[t_fft], t[t_fft]] = values[t_fft] - mean[owner[t_fft]]
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    freqs = np.linspace(0.0, 1.0, power.shape[1])
+    for i, (lo, hi) in enumerate(FFT_BANDS):
+        band = (freqs >= lo) & ((freqs < hi) if hi < 1.0 else (freqs <= hi))
+        result[f"band{i}"][keep] = power[:, band].sum(axis=1) / n
+    return result
+
+
+# --- Function: Feature rows for one file's beads ---
+def file_features(file_name, signals, beads):
+    table = {"file": file_name, "bead_number": beads.bead_number}
+    for channel, signal in zip(CHANNELS, signals):
+        for name, values in segment_features(signal, beads.start_index, beads.end_index).items():
+            table[f"{channel}_{name}"] = values
+    return pd.DataFrame(table)
+
+
+# Per-process state for the process pool
+_worker_source = None
+
+
+def _init_worker(zip_source):
+    global _worker_source
+    _worker_source = zip_source
+
+
+def _member_features_in_worker(member, beads):
+    return file_features(metadata_file_name(member), parse_member(_worker_source, member), beads)
+
+
+# --- Function: Features for every bead of every metadata-listed file in a ZIP, in parallel ---
+def extract_zip_features(zip_file, bead_index, workers=INGEST_WORKERS, use_processes=False):
+    jobs = [
+        (member, bead_index.get(metadata_file_name(member)))
+        for member in list_signal_members(zip_file)
+    ]
+    jobs = [(member, beads) for member, beads in jobs if len(beads.bead_number)]
+
+    zip_source = shared_zip_source(zip_file)
+    if use_processes:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(zip_source,)) as executor:
+            tables = list(executor.map(_member_features_in_worker, *zip(*jobs))) if jobs else []
+    else:
+        # Threads share the decoded-signal cache filled by ingestion
+        digest = zip_digest(zip_file)
+
+        def run(job):
+            member, beads = job
+            return file_features(metadata_file_name(member), cached_member(zip_source, digest, member), beads)
+        with ThreadPoolExecutor(workers, thread_name_prefix="nvh-features") as executor:
+            tables = list(executor.map(run, jobs))
+
+    if not tables:
+        return pd.DataFrame(columns=["file", "bead_number"] + feature_columns())
+    return pd.concat(tables, ignore_index=True)
+
+
+# The metadata key is a content digest, or a URL when the metadata came from GitHub
+def _features_cache_path(zip_key, metadata_key):
+    metadata_hash = hashlib.sha256(metadata_key.encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"features-{zip_key[:16]}-{metadata_hash[:16]}-v{FEATURE_VERSION}.parquet")
+
+
+# --- Function: Bead features joined to labels/predictions, cached as Parquet per (ZIP, metadata) ---
+def load_zip_features(zip_file, metadata_name, metadata_path=None, workers=INGEST_WORKERS, use_processes=False):
+    cache_path = _features_cache_path(zip_digest(zip_file), metadata_version(metadata_name, metadata_path))
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:
+            pass  # Unreadable cache, recompute below
+
+    summary_df = load_metadata(metadata_name, metadata_path)
+    bead_index = load_bead_index(metadata_name, metadata_path)
+    features = extract_zip_features(zip_file, bead_index, workers, use_processes)
+    labels = summary_df[["file", "bead_number", "start_index", "end_index"] + label_columns(summary_df)]
+    features["file"] = features["file"].astype(labels["file"].dtype)
+    table = labels.merge(features, on=["file", "bead_number"], how="inner")
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute per-bead NIR/VIS features for every CSV in a ZIP.")
+    parser.add_argument("zip_path", help="ZIP file or directory containing the signal files (CSV, .npy, .parquet)")
+    parser.add_argument("--metadata", default="241113_NVH_metadata_v03_Robust.csv", help="metadata CSV name")
+    parser.add_argument("--metadata-path", help="explicit path to the metadata CSV")
+    parser.add_argument("--out", default="bead_features.parquet", help="output Parquet file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    table = load_zip_features(args.zip_path, args.metadata, args.metadata_path, args.workers, use_processes=True)
+    table.to_parquet(args.out, index=False)
+    print(f"{len(table)} beads from {table['file'].nunique()} files -> {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from nvh.cache import BoundedMemo
+from nvh.signals import decoded_sizes, read_member, shared_zip_source, signal_cache, signal_locks, zip_digest
+
+INGEST_WORKERS = int(os.environ.get("NVH_INGEST_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# Without a spill directory, preloading stops at this share of the signal cache, leaving room
+# for the file on screen instead of evicting it (and the files just decoded)
+INGEST_CACHE_SHARE = 0.75
+
+# Running and finished ingestion jobs, keyed by ZIP content digest (the most recent MAX_INGEST_JOBS)
+MAX_INGEST_JOBS = 16
+_jobs = BoundedMemo(MAX_INGEST_JOBS)
+_jobs_lock = threading.Lock()
+
+# ZIP bytes handed to each worker process once, instead of once per member
+_worker_source = None
+
+
+def _init_worker(zip_source):
+    global _worker_source
+    _worker_source = zip_source
+
+
+# zip_source is a ZIP path or bytes, or a server directory of signal files
+def parse_member(zip_source, member, cancelled=None):
+    return read_member(zip_source, member, cancelled)
+
+
+# --- Function: Signals of one member from the cache, parsing and caching them on a miss ---
+# Takes the ZIP path or bytes, so worker threads never share an uploaded file's read position.
+def cached_member(zip_source, digest, member, cache=signal_cache):
+    signals = cache.get((digest, member))
+    if signals is None:
+        with signal_locks((digest, member)):
+            signals = cache.peek((digest, member))
+            if signals is None:
+                signals = parse_member(zip_source, member)
+                cache.put((digest, member), signals)
+    return signals
+
+
+def _parse_member_in_worker(member):
+    return parse_member(_worker_source, member)
+
+
+# --- Class: Parses every member of a ZIP into the signal cache on a worker pool ---
+class IngestJob:
+    def __init__(self, zip_source, digest, members, workers=INGEST_WORKERS, use_processes=False, cache=signal_cache):
+        self.digest = digest
+        self.members = list(members)
+        self.total = len(self.members)
+        self.completed = 0
+        self.samples = {}
+        self.errors = {}
+        self.skipped = []
+        self._cache = cache
+        self._thread = threading.Thread(
+            target=self._run, args=(zip_source, workers, use_processes), name=f"nvh-ingest-{digest[:8]}", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def done(self):
+        return self.completed >= self.total
+
+    @property
+    def progress(self):
+        return self.completed / self.total if self.total else 1.0
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done
+
+    def _run(self, zip_source, workers, use_processes):
+        pending = []
+        for member in self.members:
+            signals = self._cache.get((self.digest, member))
+            if signals is not None:
+                self._record(member, signals)
+            else:
+                pending.append(member)
+        pending = self._within_budget(zip_source, pending)
+        if not pending:
+            return
+
+        if use_processes:
+            executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(zip_source,))
+            submit = lambda member: executor.submit(_parse_member_in_worker, member)
+        else:
+            executor = ThreadPoolExecutor(workers, thread_name_prefix="nvh-ingest-worker")
+            # Members decoded meanwhile (e.g. by the prefetcher) are taken from the cache
+            submit = lambda member: executor.submit(cached_member, zip_source, self.digest, member, self._cache)
+
+        with executor:
+            futures = {submit(member): member for member in pending}
+            for future in as_completed(futures):
+                member = futures[future]
+                try:
+                    signals = future.result()
+                except Exception as exc:
+                    self.errors[member] = str(exc)
+                    self.completed += 1
+                    continue
+                if use_processes:
+                    self._cache.put((self.digest, member), signals)
+                self._record(member, signals)
+
+    def _record(self, member, signals):
+        self.samples[member] = signals.shape[1]
+        self.completed += 1
+
+    # Members that fit next to those already cached; the rest are skipped and decoded when selected
+    def _within_budget(self, zip_source, pending):
+        if self._cache.spill_dir:
+            return pending
+        # Cached members hold two float32 channels, 8 bytes per sample
+        room = int(self._cache.max_bytes * INGEST_CACHE_SHARE) - 8 * sum(self.samples.values())
+        estimates = decoded_sizes(zip_source)
+        for position, member in enumerate(pending):
+            room -= estimates.get(member, 0)
+            if room < 0:
+                self.skipped = pending[position:]
+                self.completed += len(self.skipped)
+                return pending[:position]
+        return pending
+
+
+# --- Function: Start (or reuse) background ingestion of a ZIP's CSV members ---
+def start_ingest(zip_file, members, workers=INGEST_WORKERS, use_processes=False, cache=signal_cache):
+    digest = zip_digest(zip_file)
+    with _jobs_lock:
+        job = _jobs.get(digest)
+        if job is None:
+            zip_source = shared_zip_source(zip_file)
+            job = IngestJob(zip_source, digest, members, workers, use_processes, cache)
+            _jobs.put(digest, job)
+    return job
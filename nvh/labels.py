@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+# One class list for every label and prediction column of every metadata version
+CLASSES = ["OK", "OK-like", "Hot Melt", "Poor Appearance", "Weak Weld"]
+LABEL_DTYPE = pd.CategoricalDtype(CLASSES)
+
+# Older tables store predictions as numeric class codes
+NUMERIC_CLASS_MAP = {
+    0.0: "Hot Melt",
+    1.0: "OK",
+    2.0: "Poor Appearance",
+    3.0: "Weak Weld"
+}
+
+LABEL_COLUMNS = ["original_file_label", "refined_label"]
+MISSING_CODE = -1
+
+
+def label_columns(summary_df):
+    return [col for col in summary_df.columns if col in LABEL_COLUMNS or col.endswith("_Prediction")]
+
+
+def prediction_columns(summary_df):
+    return [col for col in summary_df.columns if col.endswith("_Prediction")]
+
+
+# --- Function: Encode numeric codes or class names as the shared categorical dtype ---
+# Values outside the class list become missing, so their beads are drawn without a highlight.
+def encode_labels(values):
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        values = values.map(NUMERIC_CLASS_MAP)
+    return values.astype(LABEL_DTYPE)
+
+
+# --- Function: Values of a raw label column that encode_labels cannot map to a class ---
+def unknown_labels(values):
+    values = pd.Series(values).dropna()
+    known = set(NUMERIC_CLASS_MAP) if pd.api.types.is_numeric_dtype(values) else set(CLASSES)
+    return sorted(str(value) for value in values.unique() if value not in known)
+
+
+# --- Function: Shared int8 codes of an encoded column (-1 = missing) ---
+def label_codes(values):
+    return values.cat.codes.to_numpy().astype(np.int8)
+
+
+def class_code(class_name):
+    return CLASSES.index(class_name) if class_name in CLASSES else MISSING_CODE
+
+
+# --- Function: (rows x columns) int8 code matrix for several encoded columns ---
+def code_matrix(summary_df, columns):
+    return np.column_stack([label_codes(summary_df[col]) for col in columns])
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from nvh.cache import BoundedMemo, LRUCache
+from nvh.labels import class_code, encode_labels, label_codes, label_columns, unknown_labels
+
+# Bundled metadata lives next to the viewer scripts
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GITHUB_BASE_URL = "https://raw.githubusercontent.com/meliaph-monitech/241119_NVH_ModelComparisonResults/refs/heads/main/"
+
+# Optional overrides: a directory holding the metadata CSVs and a cache directory
+METADATA_DIR = os.environ.get("NVH_METADATA_DIR")
+CACHE_DIR = os.environ.get("NVH_CACHE_DIR", os.path.join(REPO_DIR, ".nvh_cache"))
+
+# Bump when the columnar conversion changes so stale Parquet caches are rebuilt
+CACHE_SCHEMA_VERSION = 2
+
+# Memory for metadata frames and the tables derived from them (bead indexes, disagreement)
+METADATA_CACHE_MB = int(os.environ.get("NVH_METADATA_CACHE_MB", "512"))
+
+INDEX_COLUMNS = ["bead_number", "start_index", "end_index"]
+
+# Frames shared by every session in this process, keyed by (kind, CSV content digest); evicted
+# entries are rebuilt from the Parquet cache
+metadata_cache = LRUCache(METADATA_CACHE_MB << 20, "metadata")
+_digests = BoundedMemo(256)
+_lock = threading.Lock()
+
+
+# --- Function: Locate a metadata CSV, preferring local copies over the network ---
+def resolve_metadata_path(name, path=None):
+    candidates = [path] if path else []
+    if METADATA_DIR:
+        candidates.append(os.path.join(METADATA_DIR, name))
+    candidates.append(os.path.join(REPO_DIR, name))
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+# --- Function: Content hash of a file, memoized on (path, size, mtime) ---
+def file_digest(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _digests.put(key, digest)
+    return digest
+
+
+# --- Function: Convert a raw metadata table to compact, typed columns ---
+def to_columnar(summary_df):
+    summary_df = summary_df.copy()
+    summary_df["file"] = summary_df["file"].astype("category")
+    for col in INDEX_COLUMNS:
+        summary_df[col] = summary_df[col].astype("int64")
+    # Raw values outside the class list, per column; kept in attrs, which the Parquet cache preserves
+    unknown = {}
+    for col in label_columns(summary_df):
+        values = unknown_labels(summary_df[col])
+        if values:
+            unknown[col] = values
+        summary_df[col] = encode_labels(summary_df[col])
+    for col in summary_df.columns:
+        if col.endswith("_Correct"):
+            summary_df[col] = summary_df[col].astype("boolean")
+    summary_df.attrs["unknown_labels"] = unknown
+    return summary_df
+
+
+def _cache_path(name, digest):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{digest[:16]}-v{CACHE_SCHEMA_VERSION}.parquet")
+
+
+def _read_cached(name, source, digest):
+    cache_path = _cache_path(name, digest)
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:
+            pass  # Corrupt or unreadable cache, rebuild it below
+    summary_df = to_columnar(pd.read_csv(source))
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        summary_df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Read-only install, keep the in-memory frame only
+    return summary_df
+
+
+def _metadata_key(name, path=None):
+    source = resolve_metadata_path(name, path)
+    if source is None:
+        return GITHUB_BASE_URL + name, None
+    return file_digest(source), source
+
+
+# --- Function: Version key of a metadata table (content digest, or URL when remote) ---
+def metadata_version(name, path=None):
+    return _metadata_key(name, path)[0]
+
+
+# --- Function: Load a metadata table (local file first, GitHub as last resort) ---
+# The returned frame is shared across sessions and must not be modified in place.
+def load_metadata(name, path=None):
+    key, source = _metadata_key(name, path)
+    summary_df = metadata_cache.get(("frame", key))
+    if summary_df is not None:
+        return summary_df
+
+    with _lock:
+        summary_df = metadata_cache.peek(("frame", key))
+        if summary_df is None:
+            if source is None:
+                summary_df = to_columnar(pd.read_csv(key))
+            else:
+                summary_df = _read_cached(name, source, key)
+            metadata_cache.put(("frame", key), summary_df)
+    return summary_df
+
+
+# Beads of one file as contiguous arrays; codes maps label column -> shared int8 class codes (-1 = missing)
+FileBeads = namedtuple("FileBeads", ["bead_number", "start_index", "end_index", "codes"])
+
+
+# --- Class: File name -> bead arrays, built once per metadata version ---
+class BeadIndex:
+    def __init__(self, summary_df):
+        self.columns = label_columns(summary_df)
+
+        # Group rows by file with one stable sort, then slice the sorted arrays per file
+        file_codes = summary_df["file"].cat.codes.to_numpy()
+        order = np.argsort(file_codes, kind="stable")
+        sorted_codes = file_codes[order]
+        bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(order)]))
+
+        bead_number = summary_df["bead_number"].to_numpy()[order]
+        start_index = summary_df["start_index"].to_numpy()[order]
+        end_index = summary_df["end_index"].to_numpy()[order]
+        codes = {col: label_codes(summary_df[col])[order] for col in self.columns}
+
+        file_names = summary_df["file"].cat.categories
+        self.files = {}
+        for lo, hi in zip(starts, ends):
+            self.files[file_names[sorted_codes[lo]]] = FileBeads(
+                bead_number[lo:hi],
+                start_index[lo:hi],
+                end_index[lo:hi],
+                {col: values[lo:hi] for col, values in codes.items()}
+            )
+
+        self.nbytes = bead_number.nbytes + start_index.nbytes + end_index.nbytes + sum(
+            values.nbytes for values in codes.values()
+        )
+
+        empty = np.empty(0, dtype=np.int64)
+        self._empty = FileBeads(empty, empty, empty, {col: np.empty(0, dtype=np.int8) for col in self.columns})
+
+    def get(self, file_name):
+        return self.files.get(file_name, self._empty)
+
+    def class_code(self, class_name):
+        return class_code(class_name)
+
+
+# --- Function: Load the bead index for a metadata table (shares the frame cache key) ---
+def load_bead_index(name, path=None):
+    key, _ = _metadata_key(name, path)
+    bead_index = metadata_cache.get(("beads", key))
+    if bead_index is None:
+        summary_df = load_metadata(name, path)
+        with _lock:
+            bead_index = metadata_cache.peek(("beads", key))
+            if bead_index is None:
+                bead_index = BeadIndex(summary_df)
+                metadata_cache.put(("beads", key), bead_index)
+    return bead_index
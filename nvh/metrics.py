@@ -0,0 +1,150 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from nvh.cache import KeyLocks
+from nvh.labels import CLASSES, LABEL_DTYPE, code_matrix, prediction_columns
+from nvh.metadata import load_metadata, metadata_cache, metadata_version
+
+# summary: one row per model; per_class: one row per (model, class); confusion: model -> reference x prediction counts
+ModelMetrics = namedtuple("ModelMetrics", ["summary", "per_class", "confusion"])
+
+_key_lock = KeyLocks()
+
+
+# --- Function: Row mask for a file subset and/or bead-number range ---
+def slice_mask(summary_df, files=None, bead_range=None):
+    mask = np.ones(len(summary_df), dtype=bool)
+    if files is not None:
+        mask &= summary_df["file"].isin(list(files)).to_numpy()
+    if bead_range is not None:
+        bead_number = summary_df["bead_number"].to_numpy()
+        mask &= (bead_number >= bead_range[0]) & (bead_number <= bead_range[1])
+    return mask
+
+
+# --- Function: Accuracy, per-class precision/recall/F1 and confusion matrices for every model ---
+def compute_metrics(summary_df, reference="refined_label", files=None, bead_range=None):
+    models = prediction_columns(summary_df)
+    codes = code_matrix(summary_df, [reference] + models)[slice_mask(summary_df, files, bead_range)]
+    n_classes = len(CLASSES)
+
+    # One bincount over (model, reference, prediction) for every scored bead of every model
+    truth = np.broadcast_to(codes[:, :1], (len(codes), len(models)))
+    predicted = codes[:, 1:]
+    scored = (truth >= 0) & (predicted >= 0)
+    model_ids = np.broadcast_to(np.arange(len(models)), predicted.shape)
+    flat = (model_ids * n_classes + truth) * n_classes + predicted
+    confusion = np.bincount(flat[scored], minlength=len(models) * n_classes * n_classes)
+    confusion = confusion.reshape(len(models), n_classes, n_classes)
+
+    correct = np.trace(confusion, axis1=1, axis2=2)
+    scored_count = confusion.sum(axis=(1, 2))
+    diagonal = np.diagonal(confusion, axis1=1, axis2=2)
+    support = confusion.sum(axis=2)
+    predicted_count = confusion.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accuracy = correct / scored_count
+        precision = diagonal / predicted_count
+        recall = diagonal / support
+        f1 = 2 * precision * recall / (precision + recall)
+    f1 = np.where(diagonal == 0, np.where(support + predicted_count > 0, 0.0, np.nan), f1)
+
+    summary = pd.DataFrame({
+        "model": [col.removesuffix("_Prediction") for col in models],
+        "column": models,
+        "scored_beads": scored_count,
+        "accuracy": accuracy,
+        "macro_f1": np.nanmean(np.where(support > 0, f1, np.nan), axis=1) if n_classes else np.nan
+    })
+    per_class = pd.DataFrame({
+        "model": np.repeat(summary["model"].to_numpy(), n_classes),
+        "class": np.tile(CLASSES, len(models)),
+        "precision": precision.ravel(),
+        "recall": recall.ravel(),
+        "f1": f1.ravel(),
+        "support": support.ravel()
+    })
+    confusion_frames = {
+        model: pd.DataFrame(matrix, index=pd.Index(CLASSES, name=reference), columns=pd.Index(CLASSES, name="prediction"))
+        for model, matrix in zip(summary["model"], confusion)
+    }
+    return ModelMetrics(summary, per_class, confusion_frames)
+
+
+# --- Function: Metrics for a metadata table, cached per metadata version and slice ---
+def load_metrics(name, reference="refined_label", files=None, bead_range=None, path=None):
+    key = (
+        "metrics",
+        metadata_version(name, path),
+        reference,
+        tuple(sorted(files)) if files is not None else None,
+        tuple(bead_range) if bead_range is not None else None
+    )
+    result = metadata_cache.get(key)
+    if result is None:
+        with _key_lock(key):
+            result = metadata_cache.peek(key)
+            if result is None:
+                result = compute_metrics(load_metadata(name, path), reference, files, bead_range)
+                metadata_cache.put(key, result)
+    return result
+
+
+# --- Function: Per-bead consensus, vote entropy, models wrong and dissenting models ---
+# Beads are sorted worst first: most models wrong, then most split vote.
+def compute_disagreement(summary_df, reference="refined_label"):
+    models = prediction_columns(summary_df)
+    names = np.array([col.removesuffix("_Prediction") for col in models], dtype=object)
+    codes = code_matrix(summary_df, [reference] + models)
+    truth, predicted = codes[:, 0], codes[:, 1:]
+    n_rows, n_classes = len(codes), len(CLASSES)
+
+    # Vote counts per (bead, class) from one bincount over the prediction matrix
+    voted = predicted >= 0
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], predicted.shape)
+    votes = np.bincount((rows * n_classes + predicted)[voted], minlength=n_rows * n_classes)
+    votes = votes.reshape(n_rows, n_classes)
+    voting = votes.sum(axis=1)
+
+    consensus = np.where(voting > 0, votes.argmax(axis=1), -1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = votes / voting[:, None]
+        entropy = -np.where(votes > 0, share * np.log2(share), 0.0).sum(axis=1)
+        consensus_share = votes.max(axis=1) / voting
+    entropy = np.where(voting > 0, entropy, np.nan)
+    wrong = (voted & (truth[:, None] >= 0) & (predicted != truth[:, None])).sum(axis=1)
+
+    # Dissenting models as a bit mask per bead; each distinct mask is joined to text once
+    dissent = voted & (predicted != consensus[:, None])
+    mask = (dissent.astype(np.int64) << np.arange(len(models))).sum(axis=1)
+    unique_masks, inverse = np.unique(mask, return_inverse=True)
+    labels = np.array(
+        [", ".join(names[(m >> np.arange(len(models))) & 1 == 1]) for m in unique_masks], dtype=object
+    )
+
+    table = summary_df[["file", "bead_number", "start_index", "end_index", reference]].reset_index(drop=True)
+    table = table.assign(**{
+        "consensus": pd.Categorical.from_codes(consensus, dtype=LABEL_DTYPE),
+        "consensus_share": consensus_share,
+        "vote_entropy": entropy,
+        "models_voting": voting,
+        "models_wrong": wrong,
+        "dissenting_models": labels[inverse.reshape(-1)]
+    })
+    order = np.lexsort((-np.nan_to_num(entropy, nan=-1.0), -wrong))
+    return table.iloc[order].reset_index(drop=True)
+
+
+# --- Function: Disagreement index for a metadata table, computed once per metadata version ---
+def load_disagreement(name, reference="refined_label", path=None):
+    key = ("disagreement", metadata_version(name, path), reference)
+    result = metadata_cache.get(key)
+    if result is None:
+        with _key_lock(key):
+            result = metadata_cache.peek(key)
+            if result is None:
+                result = compute_disagreement(load_metadata(name, path), reference)
+                metadata_cache.put(key, result)
+    return result
@@ -0,0 +1,108 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from nvh.cache import LRUCache
+from nvh.ingest import INGEST_WORKERS, cached_member
+from nvh.metadata import load_bead_index, metadata_version
+from nvh.signals import list_signal_members, metadata_file_name, shared_zip_source, zip_digest
+
+# Points every bead is resampled to, and memory for resampled class stacks
+OVERLAY_LENGTH = int(os.environ.get("NVH_OVERLAY_LENGTH", "1024"))
+OVERLAY_CACHE_MB = int(os.environ.get("NVH_OVERLAY_CACHE_MB", "256"))
+
+# Outer and inner percentile bands, plus the median
+BAND_PERCENTILES = [5, 25, 50, 75, 95]
+
+overlay_cache = LRUCache(OVERLAY_CACHE_MB << 20, "overlays")
+
+# Beads of one class: channels is (2, beads, length) float32; file and bead_number identify each row;
+# bands maps "mean" and "p05".."p95" to (2, length) arrays
+ClassOverlay = namedtuple("ClassOverlay", ["channels", "file", "bead_number", "bands"])
+
+
+# --- Function: Every [start, end] segment of a signal linearly resampled to `length` points, in one batch ---
+# Rows are segments, columns the common 0..1 position along the bead; segments outside the signal are NaN.
+def resample_segments(signal, starts, ends, length=OVERLAY_LENGTH):
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    result = np.full((len(starts), length), np.nan, dtype=np.float32)
+    n = len(signal)
+    valid = (starts < n) & (ends >= starts) & (ends >= 0)
+    if n == 0 or not valid.any():
+        return result
+
+    starts = np.clip(starts[valid], 0, n - 1)
+    ends = np.clip(ends[valid], starts, n - 1)
+    positions = starts[:, None] + np.linspace(0.0, 1.0, length) * (ends - starts)[:, None]
+    low = np.floor(positions).astype(np.int64)
+    high = np.minimum(low + 1, ends[:, None])
+    frac = (positions - low).astype(np.float32)
+    values = np.asarray(signal, dtype=np.float32)
+    result[valid] = values[low] * (1 - frac) + values[high] * frac
+    return result
+
+
+# --- Function: Every bead of one class (per a label/prediction column) across a ZIP, resampled ---
+# Files are read in parallel from the shared signal cache; the stack is cached per (ZIP, metadata, class).
+def class_overlay(zip_file, metadata_name, column, class_name, length=OVERLAY_LENGTH, metadata_path=None,
+                  workers=INGEST_WORKERS):
+    digest = zip_digest(zip_file)
+    key = (digest, metadata_version(metadata_name, metadata_path), column, class_name, length)
+    overlay = overlay_cache.get(key)
+    if overlay is not None:
+        return overlay
+
+    bead_index = load_bead_index(metadata_name, metadata_path)
+    code = bead_index.class_code(class_name)
+    jobs = []
+    for member in list_signal_members(zip_file):
+        beads = bead_index.get(metadata_file_name(member))
+        keep = beads.codes[column] == code
+        if keep.any():
+            jobs.append((member, beads.start_index[keep], beads.end_index[keep], beads.bead_number[keep]))
+
+    zip_source = shared_zip_source(zip_file)
+
+    def run(job):
+        member, starts, ends, _ = job
+        signals = cached_member(zip_source, digest, member)
+        return np.stack([resample_segments(signal, starts, ends, length) for signal in signals[:2]])
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="nvh-overlay") as executor:
+        stacks = list(executor.map(run, jobs))
+
+    counts = np.array([len(job[1]) for job in jobs], dtype=np.int64)
+    channels = np.concatenate(stacks, axis=1) if stacks else np.zeros((2, 0, length), dtype=np.float32)
+    overlay = ClassOverlay(
+        channels,
+        np.repeat(np.array([metadata_file_name(job[0]) for job in jobs], dtype=str), counts),
+        np.concatenate([job[3] for job in jobs]) if jobs else np.zeros(0, dtype=np.int64),
+        overlay_bands(channels)
+    )
+    overlay_cache.put(key, overlay)
+    return overlay
+
+
+# --- Function: Mean and BAND_PERCENTILES per channel and position, as {name: (2, length) array} ---
+# One sort over contiguous bead values per position, then linear interpolation at each percentile's
+# rank (numpy's default method); NaN rows (beads outside their file) sort last and are not counted.
+def overlay_bands(channels, percentiles=BAND_PERCENTILES):
+    if channels.shape[1] == 0:
+        empty = np.full((channels.shape[0], channels.shape[2]), np.nan)
+        return {"mean": empty, **{f"p{q:02d}": empty for q in percentiles}}
+    ordered = np.sort(np.ascontiguousarray(np.moveaxis(channels, 1, -1)), axis=-1)
+    counts = np.count_nonzero(~np.isnan(ordered), axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bands = {"mean": np.nansum(ordered, axis=-1, dtype=np.float64) / counts}
+    last = np.maximum(counts - 1, 0)[..., None]
+    for q in percentiles:
+        rank = (q / 100.0) * last
+        low = np.floor(rank).astype(np.int64)
+        high = np.minimum(low + 1, last)
+        frac = rank - low
+        values = np.take_along_axis(ordered, low, -1) * (1 - frac) + np.take_along_axis(ordered, high, -1) * frac
+        bands[f"p{q:02d}"] = np.where(counts > 0, values[..., 0], np.nan)
+    return bands
@@ -0,0 +1,353 @@
+import base64
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from nvh.downsample import bead_anchors, minmax_grid
+from nvh.labels import CLASSES
+from nvh.cache import LRUCache
+from nvh.signals import metadata_file_name
+from nvh.timing import count, stage
+
+# Memory budget for pre-encoded baseline layers kept across coloring changes
+BASE_LAYER_CACHE_MB = int(os.environ.get("NVH_BASE_LAYER_CACHE_MB", "256"))
+
+# Class colors and drawing order (OK on top) shared by every viewer and the batch renderer
+CLASS_COLOR_MAP = {
+    "OK": "red",
+    "OK-like": "orange",
+    "Hot Melt": "blue",
+    "Poor Appearance": "green",
+    "Weak Weld": "purple"
+}
+CLASS_ORDER = CLASSES
+
+
+# --- Function: Sample positions of several [start, end] windows, NaN-separated ---
+# Returns float positions with one NaN after each window plus the owning window of every slot.
+def segment_positions(starts, ends, length):
+    starts = np.clip(np.asarray(starts, dtype=np.int64), 0, length)
+    ends = np.clip(np.asarray(ends, dtype=np.int64), -1, length - 1)
+    lengths = np.maximum(ends - starts + 1, 0)
+
+    # Each window takes its samples plus one separator slot
+    slots = lengths + 1
+    owner = np.repeat(np.arange(len(starts)), slots)
+    first_slot = np.cumsum(slots) - slots
+    offset = np.arange(owner.size) - first_slot[owner]
+
+    positions = (starts[owner] + offset).astype(np.float64)
+    positions[offset == lengths[owner]] = np.nan
+    return positions, owner
+
+
+# --- Function: Downsampled drawing grid for a file, or None for full resolution ---
+def render_grid(channels, beads, point_budget=None):
+    if not point_budget or len(channels[0]) <= point_budget:
+        return None
+    return minmax_grid(channels, point_budget, bead_anchors(beads))
+
+
+def _trace_type(grid):
+    # WebGL traces for downsampled rendering, SVG traces otherwise
+    return go.Scatter if grid is None else go.Scattergl
+
+
+def _compact_ints(values):
+    # Smallest integer dtype that holds the values; numpy arrays ship to the browser as typed binary
+    values = np.asarray(values)
+    if values.size and np.abs(values).max() >= np.iinfo(np.int16).max:
+        return values.astype(np.int32)
+    return values.astype(np.int16)
+
+
+def _forward_fill(positions, valid):
+    # Separator slots repeat the previous sample position so they never stretch the x range
+    idx = np.where(valid, np.arange(positions.size), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return np.nan_to_num(positions[idx]).astype(np.int32)
+
+
+def typed_array(values):
+    # Plotly's typed-array spec ({dtype, bdata}), i.e. what plotly.io would send for a numpy array
+    values = np.ascontiguousarray(values)
+    return {"dtype": values.dtype.str.lstrip("<|="), "bdata": base64.b64encode(values.tobytes()).decode("ascii")}
+
+
+# --- Function: Trace arguments of the gray "All Data" baseline, one per channel ---
+# Full resolution uses an implicit x axis (x0/dx); the downsampled grid sends explicit int32 positions.
+# With encode=True the arrays are pre-encoded so a cached layer is never serialized twice.
+def baseline_trace_args(channels, grid=None, x_offset=0, encode=False):
+    pack = typed_array if encode else (lambda values: values)
+    x_args = dict(x0=x_offset, dx=1) if grid is None else dict(x=pack((grid + x_offset).astype(np.int32)))
+    traces = []
+    for row, signal in enumerate(channels, start=1):
+        y = signal if grid is None else signal[grid]
+        traces.append(dict(
+            **x_args,
+            y=pack(np.asarray(y, dtype=np.float32)),
+            mode='lines',
+            line=dict(color='gray', width=1),
+            name='All Data',
+            legendgroup='All Data',
+            showlegend=row == 1
+        ))
+    return traces
+
+
+# --- Class: Drawing grid plus pre-encoded baseline traces of one file view ---
+class BaseLayer:
+    def __init__(self, grid, traces, points):
+        self.grid = grid
+        self.traces = traces
+        self.points = points
+
+    @property
+    def nbytes(self):
+        encoded = sum(len(args["y"]["bdata"]) + len(args.get("x", {}).get("bdata", "")) for args in self.traces)
+        return encoded + (self.grid.nbytes if self.grid is not None else 0)
+
+
+base_layer_cache = LRUCache(BASE_LAYER_CACHE_MB << 20, "base_layers")
+
+
+# --- Function: Add one NaN-separated highlight trace per class per channel ---
+# With a grid, each bead keeps only the grid samples inside its window (endpoints are on the grid).
+# At full resolution a class is sent over its whole span with x0/dx (NaN between beads) whenever
+# that is smaller than sending explicit positions for the bead samples only.
+def add_highlight_traces(fig, channels, beads, bead_index, column, class_order, color_map, grid=None, x_offset=0):
+    trace = _trace_type(grid)
+    codes = beads.codes[column]
+    for pred in class_order:
+        class_code = bead_index.class_code(pred)
+        if class_code < 0:
+            continue
+        selected = np.flatnonzero(codes == class_code)
+        if selected.size == 0:
+            continue
+
+        starts = beads.start_index[selected]
+        ends = beads.end_index[selected]
+        if grid is None:
+            positions, owner = segment_positions(starts, ends, len(channels[0]))
+        else:
+            lo = np.searchsorted(grid, starts, side="left")
+            hi = np.searchsorted(grid, ends, side="right")
+            positions, owner = segment_positions(lo, hi - 1, len(grid))
+        valid = ~np.isnan(positions)
+        samples = positions[valid].astype(np.int64)
+        if grid is not None:
+            samples = grid[samples]
+            positions[valid] = samples
+        if samples.size == 0:
+            continue
+
+        bead_numbers = _compact_ints(beads.bead_number[selected])
+        span_start = samples.min()
+        span = samples.max() - span_start + 1
+        value_bytes = 4 + bead_numbers.itemsize
+        if grid is None and span * value_bytes <= positions.size * (value_bytes + 4):
+            slots = samples - span_start
+            x_args = dict(x0=int(span_start) + x_offset, dx=1)
+            customdata = np.zeros(span, dtype=bead_numbers.dtype)
+            customdata[slots] = bead_numbers[owner[valid]]
+        else:
+            slots = np.flatnonzero(valid)
+            x_args = dict(x=_forward_fill(positions, valid) + x_offset)
+            customdata = bead_numbers[owner]
+
+        color = color_map.get(pred, "black")
+        for row, signal in enumerate(channels, start=1):
+            y = np.full(customdata.shape, np.nan, dtype=np.float32)
+            y[slots] = signal[samples]
+
+            fig.add_trace(trace(
+                **x_args,
+                y=y,
+                customdata=customdata,
+                mode='lines',
+                line=dict(color=color, width=1),
+                name=f"Class {pred}",
+                legendgroup=pred,
+                hovertemplate=f"Bead Number: %{{customdata}}<br>Class: {pred}<extra></extra>",
+                showlegend=row == 1
+            ), row=row, col=1)
+
+
+# --- Function: Two-row NIR/VIS figure with the gray baseline and optional class highlights ---
+# x_offset is the file row of signals[:, 0] when only a row range was loaded (bead focus);
+# a precomputed grid (e.g. a pyramid level for the zoomed range) replaces the point-budget grid.
+# base_key identifies the view (signals, budget, range); its baseline layer is built once and
+# reused, so changing only the coloring column rebuilds just the highlight traces.
+def build_signal_figure(file_name, signals, bead_index, column=None, point_budget=None,
+                        class_order=CLASS_ORDER, color_map=CLASS_COLOR_MAP, x_offset=0, grid=None, base_key=None,
+                        title=None):
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1)
+
+    with stage("metadata_lookup"):
+        beads = bead_index.get(metadata_file_name(file_name))
+        if x_offset:
+            beads = beads._replace(start_index=beads.start_index - x_offset, end_index=beads.end_index - x_offset)
+
+    layer = base_layer_cache.get(base_key) if base_key is not None else None
+    if base_key is not None:
+        count(base_layer="hit" if layer is not None else "miss")
+    if layer is None:
+        if grid is None:
+            with stage("downsample"):
+                grid = render_grid(signals, beads, point_budget)
+        with stage("baseline_build"):
+            points = [len(signals[0]) if grid is None else len(grid)] * len(signals)
+            layer = BaseLayer(grid, baseline_trace_args(signals, grid, x_offset, encode=base_key is not None), points)
+        if base_key is not None:
+            base_layer_cache.put(base_key, layer)
+
+    with stage("trace_build"):
+        trace = _trace_type(layer.grid)
+        for row, args in enumerate(layer.traces, start=1):
+            fig.add_trace(trace(**args), row=row, col=1)
+        if column is not None:
+            add_highlight_traces(fig, signals, beads, bead_index, column, class_order, color_map, layer.grid, x_offset)
+    highlight_points = sum(len(trace.y) for trace in fig.data[len(layer.traces):])
+    count(traces=len(fig.data), points=sum(layer.points) + highlight_points)
+
+    fig.update_layout(
+        title=title or (f"Bead-Level NVH Visualization ({column})" if column else "Bead-Level NVH Visualization"),
+        xaxis_title="Index",
+        yaxis_title="NIR Signal",
+        xaxis2_title="Index",
+        yaxis2_title="VIS Signal",
+        height=700,
+        showlegend=True
+    )
+    return fig
+
+
+# --- Function: Class overlay: percentile bands, mean, median and a capped random set of single beads ---
+# x is the position along the bead (0 = start, 1 = end) after resampling every bead to a common length.
+def build_overlay_figure(overlay, class_name, column, max_traces=200, color_map=CLASS_COLOR_MAP, seed=0):
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1)
+    channels, bands = overlay.channels, overlay.bands
+    n_beads, length = channels.shape[1], channels.shape[2]
+    x = np.linspace(0.0, 1.0, length)
+    color = color_map.get(class_name, "black")
+
+    # Individual beads as one NaN-separated WebGL trace per channel
+    picked = np.sort(np.random.default_rng(seed).choice(n_beads, min(max_traces, n_beads), replace=False))
+    for row in range(2):
+        if picked.size:
+            ys = np.concatenate((channels[row, picked], np.full((picked.size, 1), np.nan, dtype=np.float32)), axis=1)
+            fig.add_trace(go.Scattergl(
+                x=np.tile(np.append(x, np.nan), picked.size).astype(np.float32),
+                y=ys.ravel(),
+                mode='lines',
+                line=dict(color=color, width=1),
+                opacity=0.15,
+                name=f'{picked.size:,} beads',
+                legendgroup='beads',
+                showlegend=row == 0
+            ), row=row + 1, col=1)
+
+        for low, high, opacity in (("p05", "p95", 0.2), ("p25", "p75", 0.35)):
+            fig.add_trace(go.Scatter(
+                x=x, y=bands[low][row], mode='lines', line=dict(width=0, color=color), opacity=opacity,
+                legendgroup=f'{low}-{high}', showlegend=False, hoverinfo='skip'
+            ), row=row + 1, col=1)
+            fig.add_trace(go.Scatter(
+                x=x, y=bands[high][row], mode='lines', line=dict(width=0, color=color), opacity=opacity,
+                fill='tonexty', name=f'{int(low[1:])}-{int(high[1:])}th percentile', legendgroup=f'{low}-{high}',
+                showlegend=row == 0
+            ), row=row + 1, col=1)
+
+        fig.add_trace(go.Scatter(
+            x=x, y=bands["p50"][row], mode='lines', line=dict(color='black', width=1, dash='dash'),
+            name='Median', legendgroup='median', showlegend=row == 0
+        ), row=row + 1, col=1)
+        fig.add_trace(go.Scatter(
+            x=x, y=bands["mean"][row], mode='lines', line=dict(color='black', width=2),
+            name='Mean', legendgroup='mean', showlegend=row == 0
+        ), row=row + 1, col=1)
+
+    fig.update_layout(
+        title=f"{class_name} beads by {column} ({n_beads:,} beads, resampled to {length} points)",
+        xaxis_title="Position along bead",
+        yaxis_title="NIR Signal",
+        xaxis2_title="Position along bead",
+        yaxis2_title="VIS Signal",
+        height=700,
+        showlegend=True
+    )
+    return fig
+
+
+def _decibels(power):
+    return (10.0 * np.log10(np.asarray(power, dtype=np.float32) + np.float32(1e-12))).astype(np.float32)
+
+
+# --- Function: NIR/VIS spectrogram heatmaps of frames first..last, averaged down to screen columns ---
+# highlight is an optional (start, end) sample window outlined on both heatmaps.
+def build_spectrogram_figure(spectrogram, first=0, last=None, highlight=None, title="Spectrogram"):
+    power, centers = spectrogram.screen_columns(first, last)
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1)
+    for row in range(power.shape[0]):
+        fig.add_trace(go.Heatmap(
+            x=centers,
+            y=spectrogram.freqs,
+            z=_decibels(power[row].T),
+            colorscale="Viridis",
+            colorbar=dict(title="dB", len=0.45, y=0.78 if row == 0 else 0.22),
+            name=["NIR", "VIS"][row]
+        ), row=row + 1, col=1)
+    if highlight is not None:
+        fig.add_vrect(x0=highlight[0], x1=highlight[1], line=dict(color="white", width=2), row="all", col=1)
+    fig.update_layout(
+        title=title,
+        xaxis2_title="Index",
+        yaxis_title="NIR frequency (x Nyquist)",
+        yaxis2_title="VIS frequency (x Nyquist)",
+        height=600
+    )
+    return fig
+
+
+# --- Function: Power spectrum of every bead of a file as heatmaps, plus the selected bead's spectrum ---
+# spectra is (2, beads, bins); class_names holds each bead's class in the coloring column (None if missing).
+def build_bead_spectra_figure(spectra, freqs, bead_numbers, class_names, selected=None, column=None,
+                              color_map=CLASS_COLOR_MAP):
+    labels = [f"{bead} · {name or 'n/a'}" for bead, name in zip(bead_numbers, class_names)]
+    fig = make_subplots(rows=2, cols=2, shared_xaxes=True, column_widths=[0.6, 0.4], vertical_spacing=0.1,
+                        horizontal_spacing=0.08)
+    for row in range(spectra.shape[0]):
+        fig.add_trace(go.Heatmap(
+            x=freqs,
+            y=labels,
+            z=_decibels(spectra[row]),
+            colorscale="Viridis",
+            colorbar=dict(title="dB", len=0.45, y=0.78 if row == 0 else 0.22, x=0.55),
+            name=["NIR", "VIS"][row]
+        ), row=row + 1, col=1)
+        if selected is not None:
+            name = class_names[selected]
+            fig.add_trace(go.Scatter(
+                x=freqs,
+                y=_decibels(spectra[row, selected]),
+                mode='lines',
+                line=dict(color=color_map.get(name, "black"), width=2),
+                name=f"Bead {bead_numbers[selected]} ({name or 'n/a'})",
+                legendgroup='selected',
+                showlegend=row == 0
+            ), row=row + 1, col=2)
+            fig.add_hrect(y0=selected - 0.5, y1=selected + 0.5, line=dict(color="white", width=2), row=row + 1, col=1)
+    fig.update_layout(
+        title=f"Bead power spectra ({column})" if column else "Bead power spectra",
+        xaxis3_title="Frequency (x Nyquist)",
+        xaxis4_title="Frequency (x Nyquist)",
+        yaxis_title="NIR bead",
+        yaxis3_title="VIS bead",
+        yaxis2_title="dB",
+        yaxis4_title="dB",
+        height=700
+    )
+    return fig
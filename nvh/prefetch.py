@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from nvh.ingest import parse_member
+from nvh.signals import decoded_sizes, shared_zip_source, signal_cache, signal_locks, zip_digest
+
+# Files either side of the selection to decode ahead, worker threads, and the byte budget for them
+PREFETCH_RADIUS = int(os.environ.get("NVH_PREFETCH_RADIUS", "2"))
+PREFETCH_WORKERS = int(os.environ.get("NVH_PREFETCH_WORKERS", "2"))
+PREFETCH_MB = int(os.environ.get("NVH_PREFETCH_MB", "512"))
+
+# Prefetchers per viewer session; the least recently used ones are shut down beyond the limit
+MAX_PREFETCHERS = 16
+
+_prefetchers = OrderedDict()
+_prefetchers_lock = threading.Lock()
+
+
+# --- Class: Decodes the neighbours of the selected member into the signal cache on a thread pool ---
+# Work for members that are no longer neighbours is cancelled: queued jobs never start and
+# running parses stop at the next chunk.
+class Prefetcher:
+    def __init__(self, zip_source, digest, members, workers=PREFETCH_WORKERS, max_bytes=PREFETCH_MB << 20,
+                 cache=signal_cache):
+        self.digest = digest
+        self.members = list(members)
+        self.max_bytes = max_bytes
+        self.completed = 0
+        self.cancelled = 0
+        self._zip_source = zip_source
+        self._cache = cache
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix=f"nvh-prefetch-{digest[:8]}")
+        self._estimates = decoded_sizes(zip_source)
+
+    # Nearest neighbours first (+1, -1, +2, -2, ...) while their estimated size fits the budget
+    def neighbours(self, selected, radius=PREFETCH_RADIUS):
+        if selected not in self.members:
+            return []
+        position = self.members.index(selected)
+        wanted, budget = [], self.max_bytes
+        for distance in range(1, radius + 1):
+            for index in (position + distance, position - distance):
+                if 0 <= index < len(self.members):
+                    member = self.members[index]
+                    budget -= self._estimates.get(member, 0)
+                    if budget < 0:
+                        return wanted
+                    wanted.append(member)
+        return wanted
+
+    def update(self, selected, radius=PREFETCH_RADIUS):
+        wanted = self.neighbours(selected, radius)
+        with self._lock:
+            # A prefetch of the newly selected member is kept: it is the file about to be plotted
+            for member in [member for member in self._pending if member not in wanted and member != selected]:
+                future, cancelled = self._pending.pop(member)
+                cancelled.set()
+                future.cancel()
+                self.cancelled += 1
+            for member in wanted:
+                if member in self._pending or self._cache.peek((self.digest, member)) is not None:
+                    continue
+                cancelled = threading.Event()
+                future = self._executor.submit(self._load, member, cancelled)
+                self._pending[member] = (future, cancelled)
+        return wanted
+
+    def _load(self, member, cancelled):
+        try:
+            with signal_locks((self.digest, member)):
+                if cancelled.is_set() or self._cache.peek((self.digest, member)) is not None:
+                    return
+                signals = parse_member(self._zip_source, member, cancelled)
+                if signals is not None:
+                    self._cache.put((self.digest, member), signals)
+                    self.completed += 1
+        finally:
+            with self._lock:
+                entry = self._pending.get(member)
+                if entry is not None and entry[1] is cancelled:
+                    del self._pending[member]
+
+    # Block until an in-flight prefetch of member finishes, so it is not parsed a second time
+    def wait(self, member):
+        with self._lock:
+            entry = self._pending.get(member)
+        if entry is not None:
+            entry[0].exception()
+
+    def shutdown(self):
+        with self._lock:
+            for future, cancelled in self._pending.values():
+                cancelled.set()
+                future.cancel()
+            self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Function: Prefetch the files around the selection for one viewer session ---
+# Returns once the selected member itself is not being decoded by an earlier prefetch.
+def prefetch_adjacent(zip_file, members, selected, owner=None, radius=PREFETCH_RADIUS):
+    digest = zip_digest(zip_file)
+    with _prefetchers_lock:
+        prefetcher = _prefetchers.get(owner)
+        if prefetcher is None or prefetcher.digest != digest or prefetcher.members != list(members):
+            if prefetcher is not None:
+                prefetcher.shutdown()
+            zip_source = shared_zip_source(zip_file)
+            prefetcher = Prefetcher(zip_source, digest, members)
+            _prefetchers[owner] = prefetcher
+        _prefetchers.move_to_end(owner)
+        while len(_prefetchers) > MAX_PREFETCHERS:
+            _, evicted = _prefetchers.popitem(last=False)
+            evicted.shutdown()
+    prefetcher.update(selected, radius)
+    prefetcher.wait(selected)
+    return prefetcher
@@ -0,0 +1,141 @@
+import os
+import threading
+
+import numpy as np
+
+from nvh.downsample import bead_anchors
+from nvh.cache import KeyLocks, LRUCache
+from nvh.signals import metadata_file_name, signal_cache, zip_digest
+from nvh.timing import stage
+
+# Finest pyramid level (16-sample buckets); anything finer is drawn from the raw signal
+MIN_LEVEL = 4
+PYRAMID_CACHE_MB = int(os.environ.get("NVH_PYRAMID_CACHE_MB", "256"))
+
+pyramid_cache = LRUCache(PYRAMID_CACHE_MB << 20, "pyramids")
+_key_lock = KeyLocks()
+
+
+# --- Class: Min/max sample positions per channel at power-of-two bucket sizes ---
+# levels[i] is a (2 * channels, buckets) array of positions for buckets of 2 ** (MIN_LEVEL + i)
+# samples; rows alternate min/max per channel. Positions index the full-resolution signal.
+class SignalPyramid:
+    def __init__(self, length, levels):
+        self.length = length
+        self.levels = levels
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+    # Coarsest level still giving about point_budget points over width samples, or None for raw samples
+    def level_for(self, width, point_budget):
+        if width <= point_budget or not self.levels:
+            return None
+        rows = self.levels[0].shape[0]
+        shift = int(np.ceil(np.log2(rows * width / point_budget)))
+        return min(max(shift - MIN_LEVEL, 0), len(self.levels) - 1)
+
+    # Sample positions to draw for [first, last], always including the range ends and the anchors
+    def grid(self, first, last, point_budget, anchors=()):
+        anchors = np.asarray(anchors, dtype=np.int64)
+        anchors = anchors[(anchors >= first) & (anchors <= last)]
+        level = self.level_for(last - first + 1, point_budget)
+        if level is None:
+            return np.arange(first, last + 1)
+        shift = MIN_LEVEL + level
+        positions = self.levels[level][:, first >> shift:(last >> shift) + 1].ravel()
+        positions = positions[(positions >= first) & (positions <= last)]
+        return np.unique(np.concatenate((positions, anchors, [first, last])))
+
+
+# --- Function: Build every pyramid level; each level pairs up the buckets of the level below ---
+def build_pyramid(channels):
+    length = len(channels[0])
+    dtype = np.int64 if length >= np.iinfo(np.int32).max else np.int32
+    size = 1 << MIN_LEVEL
+    if length < 2 * size:
+        return SignalPyramid(length, [])
+
+    rows = []
+    full = length // size * size
+    for signal in channels:
+        signal = np.asarray(signal)
+        blocks = signal[:full].reshape(-1, size)
+        base = np.arange(blocks.shape[0], dtype=np.int64) * size
+        for pick in (np.argmin, np.argmax):
+            positions = base + pick(blocks, axis=1)
+            if full < length:
+                positions = np.append(positions, full + pick(signal[full:]))
+            rows.append(positions)
+    finest = np.array(rows)
+    levels = [finest.astype(dtype)]
+
+    values = np.array([np.asarray(channels[i // 2])[finest[i]] for i in range(len(rows))])
+    while levels[-1].shape[1] > 1:
+        positions, current = levels[-1], values
+        if positions.shape[1] % 2:
+            positions = np.concatenate((positions, positions[:, -1:]), axis=1)
+            current = np.concatenate((current, current[:, -1:]), axis=1)
+        left, right = current[:, 0::2], current[:, 1::2]
+        # Even rows keep the smaller child (minimum), odd rows the larger (maximum)
+        take_left = np.where((np.arange(len(rows)) % 2 == 0)[:, None], left <= right, left >= right)
+        levels.append(np.where(take_left, positions[:, 0::2], positions[:, 1::2]))
+        values = np.where(take_left, left, right)
+    return SignalPyramid(length, levels)
+
+
+def _save_pyramid(path, pyramid):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp_path, length=pyramid.length, **{f"level_{i}": level for i, level in enumerate(pyramid.levels)})
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # Disk full or read-only, keep the in-memory copy only
+
+
+def _load_saved_pyramid(path):
+    with np.load(path) as saved:
+        levels = [saved[f"level_{i}"] for i in range(len(saved.files) - 1)]
+        return SignalPyramid(int(saved["length"]), levels)
+
+
+# --- Function: Pyramid of one ZIP member, built once and stored next to its spilled signals ---
+def load_pyramid(zip_file, member, signals, cache=pyramid_cache, signals_cache=signal_cache):
+    key = (zip_digest(zip_file), member)
+    pyramid = cache.get(key)
+    if pyramid is not None:
+        return pyramid
+
+    path = signals_cache.spill_path(key, ".pyramid.npz") if signals_cache.spill_dir else None
+    with _key_lock(key):
+        pyramid = cache.peek(key)
+        if pyramid is not None:
+            return pyramid
+        if path and os.path.exists(path):
+            try:
+                pyramid = _load_saved_pyramid(path)
+            except (OSError, ValueError, KeyError):
+                pyramid = None
+        if pyramid is None:
+            with stage("pyramid_build"):
+                pyramid = build_pyramid(signals)
+            if path:
+                _save_pyramid(path, pyramid)
+        cache.put(key, pyramid)
+    return pyramid
+
+
+# --- Function: Drawing grid for the visible x-range of a file (the whole file when view_range is None) ---
+# Bead start/end indices are always on the grid so highlight coloring lines up at every level.
+def pyramid_grid(zip_file, member, signals, bead_index, view_range, point_budget):
+    length = signals.shape[1]
+    first, last = view_range if view_range is not None else (0, length - 1)
+    first, last = max(int(first), 0), min(int(last), length - 1)
+    beads = bead_index.get(metadata_file_name(member))
+    if last - first + 1 <= point_budget:
+        return np.arange(first, last + 1)
+    pyramid = load_pyramid(zip_file, member, signals)
+    with stage("downsample"):
+        return pyramid.grid(first, last, point_budget, bead_anchors(beads))
@@ -0,0 +1,123 @@
+"""Render every CSV in a ZIP to standalone HTML figures, one per label/prediction column.
+
+Example:
+    python -m nvh.render shift.zip --metadata 241113_NVH_metadata_v03_Robust.csv --out review_pack
+"""
+import argparse
+import html
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from nvh.ingest import parse_member
+from nvh.metadata import load_bead_index
+from nvh.plotting import build_signal_figure
+from nvh.signals import list_signal_members
+
+# Per-process state set once by the pool initializer
+_bead_index = None
+_options = None
+
+
+def _init_worker(metadata_name, metadata_path, options):
+    global _bead_index, _options
+    _bead_index = load_bead_index(metadata_name, metadata_path)
+    _options = options
+
+
+def _slug(text):
+    return re.sub(r"[^\w.-]+", "_", text).strip("_")
+
+
+def figure_file_name(member, column):
+    return f"{_slug(os.path.splitext(member)[0])}__{_slug(column)}.html"
+
+
+# --- Function: Render one ZIP member for every selected column (runs in a worker) ---
+def render_member(member):
+    signals = parse_member(_options["zip_path"], member)
+    written = {}
+    for column in _options["columns"]:
+        fig = build_signal_figure(member, signals, _bead_index, column, _options["point_budget"],
+                                  base_key=(_options["zip_path"], member, _options["point_budget"]))
+        file_name = figure_file_name(member, column)
+        fig.write_html(os.path.join(_options["out_dir"], file_name), include_plotlyjs="directory")
+        written[column] = file_name
+    return member, written
+
+
+# --- Function: Index page linking every rendered figure ---
+def write_index(out_dir, zip_path, columns, rendered, errors):
+    header = "".join(f"<th>{html.escape(column)}</th>" for column in columns)
+    rows = []
+    for member in sorted(set(rendered) | set(errors)):
+        if member in errors:
+            cells = f"<td colspan='{len(columns)}'>failed: {html.escape(errors[member])}</td>"
+        else:
+            cells = "".join(
+                f"<td><a href='{html.escape(rendered[member][column])}'>plot</a></td>" for column in columns
+            )
+        rows.append(f"<tr><td>{html.escape(member)}</td>{cells}</tr>")
+
+    page = (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>NVH review pack: {html.escape(os.path.basename(zip_path))}</title>"
+        "<style>body{font-family:sans-serif}td,th{padding:2px 8px;text-align:left}</style></head><body>"
+        f"<h1>{html.escape(os.path.basename(zip_path))}</h1>"
+        f"<p>{len(rendered)} files rendered, {len(errors)} failed.</p>"
+        f"<table><tr><th>File</th>{header}</tr>{''.join(rows)}</table></body></html>"
+    )
+    index_path = os.path.join(out_dir, "index.html")
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return index_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export NVH bead highlight plots for every CSV in a ZIP.")
+    parser.add_argument("zip_path", help="ZIP file or directory containing the signal files (CSV, .npy, .parquet)")
+    parser.add_argument("--metadata", default="241113_NVH_metadata_v03_Robust.csv",
+                        help="metadata CSV name (bundled copy, NVH_METADATA_DIR or --metadata-path)")
+    parser.add_argument("--metadata-path", help="explicit path to the metadata CSV")
+    parser.add_argument("--columns", nargs="+", help="label/prediction columns to render (default: all)")
+    parser.add_argument("--out", default="nvh_review", help="output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--point-budget", type=int, default=None,
+                        help="downsample to this many points per trace (WebGL); full resolution if omitted")
+    args = parser.parse_args(argv)
+
+    bead_index = load_bead_index(args.metadata, args.metadata_path)
+    columns = args.columns or bead_index.columns
+    unknown = [column for column in columns if column not in bead_index.columns]
+    if unknown:
+        parser.error(f"unknown columns: {', '.join(unknown)} (available: {', '.join(bead_index.columns)})")
+
+    members = list_signal_members(args.zip_path)
+    os.makedirs(args.out, exist_ok=True)
+
+    options = {
+        "zip_path": os.path.abspath(args.zip_path),
+        "columns": columns,
+        "out_dir": args.out,
+        "point_budget": args.point_budget
+    }
+    rendered, errors = {}, {}
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                             initargs=(args.metadata, args.metadata_path, options)) as executor:
+        futures = {executor.submit(render_member, member): member for member in members}
+        for done, future in enumerate(as_completed(futures), start=1):
+            member = futures[future]
+            try:
+                _, rendered[member] = future.result()
+            except Exception as exc:
+                errors[member] = str(exc)
+            print(f"[{done}/{len(members)}] {member}{' (failed)' if member in errors else ''}", file=sys.stderr)
+
+    index_path = write_index(args.out, args.zip_path, columns, rendered, errors)
+    print(index_path)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import bisect
+import io
+import mmap
+import os
+import zipfile
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+from nvh.cache import KeyLocks, LRUCache
+from nvh.signals import (
+    LOCAL_HEADER_SIZE, is_directory, load_signals, member_data_offset, member_path, parse_signal_csv, signal_cache,
+    zip_digest
+)
+from nvh.timing import count, stage
+
+# Rows between recorded row offsets, and uncompressed bytes between decompressor snapshots
+ROW_STRIDE = 1024
+CHECKPOINT_BYTES = 8 << 20
+CHUNK_BYTES = 1 << 20
+ROW_INDEX_CACHE_MB = int(os.environ.get("NVH_ROW_INDEX_CACHE_MB", "128"))
+
+# A copied zlib inflate state holds its 32 KiB window plus about 7 KiB of tables
+ZLIB_SNAPSHOT_BYTES = 40 << 10
+
+row_index_cache = LRUCache(ROW_INDEX_CACHE_MB << 20, "row_index")
+_key_lock = KeyLocks()
+
+
+# --- Function: Random-access view of the ZIP bytes (mmap for paths, the upload's buffer otherwise) ---
+@contextmanager
+def _zip_buffer(zip_file):
+    if isinstance(zip_file, (str, os.PathLike)):
+        with open(zip_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+    else:
+        view = zip_file.getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()
+
+
+# --- Function: (buffer, data_start, data_end, deflated) of one member's bytes ---
+# Plain CSV files in a server directory are mapped directly and read like stored ZIP members.
+@contextmanager
+def _member_span(zip_file, member):
+    if is_directory(zip_file):
+        path = member_path(zip_file, member)
+        if os.path.getsize(path) == 0:
+            yield b"", 0, 0, False
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer, 0, len(buffer), False
+        return
+
+    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+        info = zip_ref.getinfo(member)
+    with _zip_buffer(zip_file) as buffer:
+        data_start, data_end = _member_data_range(buffer, info)
+        yield buffer, data_start, data_end, info.compress_type == zipfile.ZIP_DEFLATED
+
+
+# --- Class: Byte offsets of every ROW_STRIDE-th row of one ZIP member plus inflate snapshots ---
+# A snapshot (uncompressed offset, compressed offset, zlib state) every CHECKPOINT_BYTES lets a
+# read resume decompression close to any row instead of inflating the member from the start.
+class RowOffsetIndex:
+    def __init__(self, data_start, data_end, deflated, header, row_offsets, n_rows, checkpoints):
+        self.data_start = data_start
+        self.data_end = data_end
+        self.deflated = deflated
+        self.header = header
+        self.row_offsets = row_offsets
+        self.n_rows = n_rows
+        self.checkpoints = checkpoints
+        self._checkpoint_offsets = [checkpoint[0] for checkpoint in checkpoints]
+
+    @property
+    def nbytes(self):
+        snapshots = sum(ZLIB_SNAPSHOT_BYTES for checkpoint in self.checkpoints if checkpoint[2] is not None)
+        return self.row_offsets.nbytes + len(self.header) + snapshots
+
+    # Uncompressed chunks of the member starting at uncompressed byte `offset`
+    def stream(self, buffer, offset):
+        if not self.deflated:
+            for position in range(self.data_start + offset, self.data_end, CHUNK_BYTES):
+                yield bytes(buffer[position:min(position + CHUNK_BYTES, self.data_end)])
+            return
+
+        i = bisect.bisect_right(self._checkpoint_offsets, offset) - 1
+        produced, position, snapshot = self.checkpoints[i]
+        decompressor = snapshot.copy()
+        while position < self.data_end:
+            raw = bytes(buffer[position:min(position + CHUNK_BYTES, self.data_end)])
+            position += len(raw)
+            data = decompressor.decompress(raw)
+            if produced + len(data) > offset:
+                yield data[max(offset - produced, 0):]
+            produced += len(data)
+
+
+def _member_data_range(buffer, info):
+    if info.flag_bits & 0x1:
+        raise ValueError(f"{info.filename}: encrypted ZIP members are not supported")
+    if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        raise ValueError(f"{info.filename}: unsupported compression method {info.compress_type}")
+    data_start = member_data_offset(info, buffer[info.header_offset:info.header_offset + LOCAL_HEADER_SIZE])
+    return data_start, data_start + info.compress_size
+
+
+# --- Function: One streaming pass over a member to record row offsets and inflate snapshots ---
+def build_row_index(buffer, data_start, data_end, deflated):
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if deflated else None
+    checkpoints = [(0, data_start, decompressor.copy() if deflated else None)]
+
+    header = None
+    row_offsets = []
+    newlines = 0
+    produced = 0
+    trailing = False
+    position = data_start
+    while position < data_end:
+        raw = bytes(buffer[position:min(position + CHUNK_BYTES, data_end)])
+        position += len(raw)
+        data = decompressor.decompress(raw) if deflated else raw
+        if not data:
+            continue
+
+        # Newline k ends line k; data row r (line r + 1) starts right after newline r
+        ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10)
+        if header is None and ends.size:
+            header = data[:ends[0] + 1]
+        numbers = newlines + np.arange(ends.size)
+        row_offsets.append(produced + ends[numbers % ROW_STRIDE == 0] + 1)
+        newlines += ends.size
+        produced += len(data)
+        trailing = data[-1:] != b"\n"
+
+        if deflated and produced - checkpoints[-1][0] >= CHECKPOINT_BYTES and position < data_end:
+            checkpoints.append((produced, position, decompressor.copy()))
+
+    n_rows = max(newlines - 1 + int(trailing), 0)
+    row_offsets = np.concatenate(row_offsets) if row_offsets else np.zeros(0, dtype=np.int64)
+    return RowOffsetIndex(data_start, data_end, deflated, header or b"", row_offsets, n_rows, checkpoints)
+
+
+# --- Function: Row offset index of a CSV member, built once and kept in the row_index cache ---
+def row_index(zip_file, member, span=None):
+    key = (zip_digest(zip_file), member)
+    index = row_index_cache.get(key)
+    if index is not None:
+        return index
+
+    with _key_lock(key):
+        index = row_index_cache.peek(key)
+        if index is None:
+            with stage("row_index"):
+                if span is None:
+                    with _member_span(zip_file, member) as span:
+                        index = build_row_index(*span)
+                else:
+                    index = build_row_index(*span)
+            row_index_cache.put(key, index)
+    return index
+
+
+# --- Function: Rows first..last (inclusive, clipped to the file) as a (2, k) float32 array ---
+def read_rows(buffer, index, first, last):
+    if index.n_rows == 0:
+        return np.zeros((2, 0), dtype=np.float32), 0
+    first = min(max(first, 0), max(index.n_rows - 1, 0))
+    last = min(max(last, first), index.n_rows - 1)
+    skip = first % ROW_STRIDE
+    wanted = last - first + 1
+
+    # Seek to the nearest recorded row, then collect just enough lines
+    chunks, newlines = [], 0
+    for data in index.stream(buffer, int(index.row_offsets[first // ROW_STRIDE])):
+        chunks.append(data)
+        newlines += data.count(b"\n")
+        if newlines >= skip + wanted:
+            break
+    lines = b"".join(chunks).split(b"\n", skip + wanted)
+    body = b"\n".join(lines[skip:skip + wanted])
+    return parse_signal_csv(io.BytesIO(index.header + body)), first
+
+
+# --- Function: Signals for a row range of one member, independent of the member's length ---
+# Returns (signals, first_row); slices the decoded file instead when it is already cached.
+# .npy and Parquet members have no rows to index: they are loaded (memory-mapped for .npy) and sliced.
+def load_signal_range(zip_file, member, first, last, cache=signal_cache):
+    if not member.lower().endswith(".csv"):
+        signals = load_signals(zip_file, member, cache)
+        first = min(max(first, 0), max(signals.shape[1] - 1, 0))
+        return signals[:, first:max(last, first) + 1], first
+
+    with stage("zip_hash"):
+        key = (zip_digest(zip_file), member)
+    signals = cache.peek(key)
+    if signals is not None:
+        count(signal_cache="hit")
+        first = min(max(first, 0), signals.shape[1] - 1)
+        return signals[:, first:max(last, first) + 1], first
+
+    count(signal_cache="range")
+    with _member_span(zip_file, member) as span:
+        index = row_index(zip_file, member, span)
+        with stage("range_read"):
+            return read_rows(span[0], index, first, last)
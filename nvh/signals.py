@@ -0,0 +1,292 @@
+import hashlib
+import io
+import os
+import struct
+import time
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from nvh.cache import BoundedMemo, KeyLocks, LRUCache
+from nvh.timing import add_stage, count, stage
+
+# Memory budget for decoded signals and an optional directory to spill them to as .npy
+SIGNAL_CACHE_MB = int(os.environ.get("NVH_SIGNAL_CACHE_MB", "1024"))
+SIGNAL_SPILL_DIR = os.environ.get("NVH_SIGNAL_SPILL_DIR")
+UPLOAD_CACHE_MB = int(os.environ.get("NVH_UPLOAD_CACHE_MB", "1024"))
+
+# Signal file types: CSV text, or pre-converted float32 (2, n) .npy / two-column Parquet
+SIGNAL_SUFFIXES = (".csv", ".npy", ".parquet")
+
+# Decoded float32 NIR/VIS take about half the bytes of their CSV text ("0.12345,0.67890\n");
+# .npy and Parquet members are already about their decoded size
+DECODED_PER_CSV_BYTE = 0.5
+
+# Server paths are identified by their file stats, re-checked at most this often
+PATH_DIGEST_TTL = 2.0
+
+# ZIP local file header: signature ... file name length, extra field length (30 bytes)
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+LOCAL_HEADER_SIZE = _LOCAL_HEADER.size
+
+# Digests of recent uploads (by file_id) and server paths
+_zip_digests = BoundedMemo(1024)
+_path_digests = BoundedMemo(1024)
+
+# Held while a member is decoded, so sessions and background workers parse each member once
+signal_locks = KeyLocks()
+
+
+def is_directory(source):
+    return isinstance(source, (str, os.PathLike)) and os.path.isdir(source)
+
+
+# --- Function: Identity of a server ZIP or directory from its path and file stats (no full read) ---
+def _path_digest(path):
+    path = os.path.realpath(path)
+    now = time.monotonic()
+    memo = _path_digests.get(path)
+    if memo is not None and memo[0] > now:
+        return memo[1]
+
+    sha = hashlib.sha256(path.encode())
+    if os.path.isdir(path):
+        for member in list_signal_members(path):
+            stat = os.stat(os.path.join(path, member))
+            sha.update(f"{member}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    else:
+        stat = os.stat(path)
+        sha.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    digest = sha.hexdigest()
+    _path_digests.put(path, (now + PATH_DIGEST_TTL, digest))
+    return digest
+
+
+# --- Function: Content hash of an uploaded ZIP, or the stat-based identity of a server path ---
+# Streamlit uploads carry a file_id, so each upload is hashed only once.
+def zip_digest(zip_file):
+    if isinstance(zip_file, (str, os.PathLike)):
+        return _path_digest(zip_file)
+
+    memo_key = getattr(zip_file, "file_id", None)
+    digest = _zip_digests.get(memo_key) if memo_key is not None else None
+    if digest is not None:
+        return digest
+
+    sha = hashlib.sha256()
+    position = zip_file.tell()
+    zip_file.seek(0)
+    for chunk in iter(lambda: zip_file.read(1 << 20), b""):
+        sha.update(chunk)
+    zip_file.seek(position)
+    digest = sha.hexdigest()
+    if memo_key is not None:
+        _zip_digests.put(memo_key, digest)
+    return digest
+
+
+# --- Function: Signal files of a ZIP (upload, path or bytes) or a server directory, as member names ---
+def list_signal_members(source):
+    if is_directory(source):
+        members = []
+        for folder, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(SIGNAL_SUFFIXES):
+                    members.append(os.path.relpath(os.path.join(folder, name), source).replace(os.sep, "/"))
+        return sorted(members)
+    with open_zip(source) as zip_ref:
+        return [name for name in zip_ref.namelist() if name.lower().endswith(SIGNAL_SUFFIXES)]
+
+
+# --- Function: Uncompressed size of every member (the prefetch budget estimate) ---
+def member_sizes(source):
+    if is_directory(source):
+        return {member: os.path.getsize(member_path(source, member)) for member in list_signal_members(source)}
+    with open_zip(source) as zip_ref:
+        return {info.filename: info.file_size for info in zip_ref.infolist()}
+
+
+# --- Function: Estimated decoded bytes of every member, from its stored size ---
+def decoded_sizes(source):
+    return {
+        member: int(size * DECODED_PER_CSV_BYTE) if member.lower().endswith(".csv") else size
+        for member, size in member_sizes(source).items()
+    }
+
+
+# --- Function: The metadata's file name for a member (converted .npy/.parquet signals keep their CSV stem) ---
+def metadata_file_name(member):
+    name = os.path.basename(member)
+    stem, suffix = os.path.splitext(name)
+    return name if suffix.lower() == ".csv" else f"{stem}.csv"
+
+
+def open_zip(zip_source):
+    return zipfile.ZipFile(io.BytesIO(zip_source) if isinstance(zip_source, bytes) else zip_source, 'r')
+
+
+# --- Function: Path of a directory member; members never resolve outside the directory ---
+def member_path(directory, member):
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, member))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"{member} is outside {directory}")
+    return path
+
+
+# --- Function: Binary file object of one member of a ZIP or server directory ---
+@contextmanager
+def open_member(source, member):
+    if is_directory(source):
+        with open(member_path(source, member), "rb") as file:
+            yield file
+    else:
+        with open_zip(source) as zip_ref, zip_ref.open(member) as file:
+            yield file
+
+
+# --- Function: Parse a signal CSV into a (2, n) float32 array (row 0 = NIR, row 1 = VIS) ---
+# With a `cancelled` event the file is read in chunks and None is returned once the event is set.
+def parse_signal_csv(file, cancelled=None, chunk_rows=250_000):
+    if cancelled is None:
+        raw_data = pd.read_csv(file)
+        return np.ascontiguousarray(raw_data.iloc[:, :2].to_numpy(dtype=np.float32).T)
+
+    parts = []
+    if cancelled.is_set():
+        return None
+    for chunk in pd.read_csv(file, chunksize=chunk_rows):
+        if cancelled.is_set():
+            return None
+        parts.append(chunk.iloc[:, :2].to_numpy(dtype=np.float32))
+    if not parts:
+        return np.zeros((2, 0), dtype=np.float32)
+    return np.ascontiguousarray(np.concatenate(parts).T)
+
+
+# --- Function: (2, n) float32 view of a pre-converted array ((2, n) as written by the spill, or (n, 2+)) ---
+def _as_channels(array):
+    if array.ndim != 2 or min(array.shape) < 2:
+        raise ValueError(f"expected a two-channel signal array, got shape {array.shape}")
+    channels = array[:2] if array.shape[0] == 2 else array[:, :2].T
+    return channels if channels.dtype == np.float32 else np.array(channels, dtype=np.float32)
+
+
+# --- Function: Offset of a ZIP member's data, given the LOCAL_HEADER_SIZE bytes at its header offset ---
+def member_data_offset(info, local_header):
+    fields = _LOCAL_HEADER.unpack(bytes(local_header))
+    name_length, extra_length = fields[-2], fields[-1]
+    return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+
+# --- Function: Memory-mapped .npy member stored uncompressed in a ZIP on disk, or None ---
+def _map_zip_npy(zip_path, info):
+    if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+        return None
+    with open(zip_path, "rb") as f:
+        f.seek(info.header_offset)
+        f.seek(member_data_offset(info, f.read(LOCAL_HEADER_SIZE)))
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        else:
+            return None
+        offset = f.tell()
+    return np.memmap(zip_path, dtype=dtype, mode="r", offset=offset, shape=shape, order="F" if fortran_order else "C")
+
+
+# --- Function: Decoded signals of any member (CSV parsed, .npy memory-mapped where possible, Parquet read) ---
+def read_member(source, member, cancelled=None):
+    suffix = os.path.splitext(member)[1].lower()
+    if suffix == ".csv":
+        with open_member(source, member) as file:
+            return parse_signal_csv(file, cancelled)
+
+    if is_directory(source):
+        path = member_path(source, member)
+        if suffix == ".npy":
+            return _as_channels(np.load(path, mmap_mode="r"))
+        return _as_channels(pd.read_parquet(path, memory_map=True).iloc[:, :2].to_numpy(dtype=np.float32))
+
+    with open_zip(source) as zip_ref:
+        info = zip_ref.getinfo(member)
+        if suffix == ".npy" and isinstance(source, (str, os.PathLike)):
+            mapped = _map_zip_npy(source, info)
+            if mapped is not None:
+                return _as_channels(mapped)
+        data = io.BytesIO(zip_ref.read(info))
+    if suffix == ".npy":
+        return _as_channels(np.load(data))
+    return _as_channels(pd.read_parquet(data).iloc[:, :2].to_numpy(dtype=np.float32))
+
+
+signal_cache = LRUCache(SIGNAL_CACHE_MB << 20, "signals", SIGNAL_SPILL_DIR)
+
+# Uploaded ZIP bytes, one copy per content digest however many sessions uploaded the same file
+upload_cache = LRUCache(UPLOAD_CACHE_MB << 20, "uploads")
+
+
+# --- Function: ZIP path as is, or an upload's bytes shared by every session that uploaded the same ZIP ---
+# Background workers take this instead of the upload object, whose read position is per session.
+def shared_zip_source(zip_file):
+    if isinstance(zip_file, (str, os.PathLike)):
+        return zip_file
+    key = (zip_digest(zip_file), None)
+    data = upload_cache.get(key)
+    if data is None:
+        data = zip_file.getvalue()
+        upload_cache.put(key, data)
+    return data
+
+
+# --- Class: File wrapper that accumulates the time spent reading (i.e. decompressing) ---
+class _TimedReader:
+    def __init__(self, file):
+        self._file = file
+        self.seconds = 0.0
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        data = self._file.read(size)
+        self.seconds += time.perf_counter() - start
+        return data
+
+    read1 = read
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+# --- Function: Decoded NIR/VIS signals of one member (ZIP or server directory), parsed at most once ---
+def load_signals(zip_file, member, cache=signal_cache):
+    with stage("zip_hash"):
+        key = (zip_digest(zip_file), member)
+    signals = cache.get(key)
+    count(signal_cache="hit" if signals is not None else "miss")
+    if signals is not None:
+        return signals
+
+    with signal_locks(key):
+        signals = cache.peek(key)
+        if signals is not None:
+            return signals
+        if not member.lower().endswith(".csv"):
+            with stage("signal_read"):
+                signals = read_member(zip_file, member)
+        else:
+            with open_member(zip_file, member) as file:
+                reader = _TimedReader(file)
+                start = time.perf_counter()
+                signals = parse_signal_csv(reader)
+                elapsed = time.perf_counter() - start
+            add_stage("zip_decompress", reader.seconds)
+            add_stage("csv_parse", elapsed - reader.seconds)
+        cache.put(key, signals)
+    return signals
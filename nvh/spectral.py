@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from nvh.cache import LRUCache
+from nvh.signals import zip_digest
+from nvh.timing import count, stage
+
+# STFT frame length and hop in samples (the recordings carry no sample rate, so frequencies are
+# fractions of the Nyquist frequency, as for the bead features)
+STFT_WINDOW = int(os.environ.get("NVH_STFT_WINDOW", "256"))
+STFT_HOP = int(os.environ.get("NVH_STFT_HOP", "64"))
+SPECTRAL_CACHE_MB = int(os.environ.get("NVH_SPECTRAL_CACHE_MB", "256"))
+
+# Heatmap columns sent to the browser; longer frame ranges are averaged down to this
+SCREEN_COLUMNS = 1200
+
+# Frames transformed per batched FFT call, bounding the temporary float32 frame copies
+FFT_BLOCK_FRAMES = 8192
+
+spectral_cache = LRUCache(SPECTRAL_CACHE_MB << 20, "spectra")
+
+
+# --- Class: Hann-windowed STFT power of every channel of one signal view ---
+# power is (channels, frames, bins) float32; frame i covers samples x_offset + i * hop .. + window - 1.
+class Spectrogram:
+    def __init__(self, power, window, hop, x_offset=0):
+        self.power = power
+        self.window = window
+        self.hop = hop
+        self.x_offset = x_offset
+        self._bead_spectra = {}
+
+    @property
+    def nbytes(self):
+        return self.power.nbytes + sum(spectra.nbytes for spectra in self._bead_spectra.values())
+
+    @property
+    def freqs(self):
+        return np.linspace(0.0, 1.0, self.power.shape[2])
+
+    # Sample index of each frame's centre
+    def frame_centers(self, first=0, last=None):
+        last = self.power.shape[1] - 1 if last is None else last
+        return self.x_offset + np.arange(first, last + 1) * self.hop + self.window // 2
+
+    # Frames lying inside [start, end] (sample indices); a window shorter than one frame gets its nearest frame
+    def frame_range(self, start, end):
+        n_frames = self.power.shape[1]
+        start = np.asarray(start, dtype=np.int64) - self.x_offset
+        end = np.asarray(end, dtype=np.int64) - self.x_offset
+        first = -(-start // self.hop)
+        last = (end + 1 - self.window) // self.hop
+        nearest = np.clip(np.rint(np.maximum(start, 0) / self.hop).astype(np.int64), 0, n_frames - 1)
+        short = last < first
+        first = np.clip(np.where(short, nearest, first), 0, n_frames - 1)
+        last = np.clip(np.where(short, nearest, last), first, n_frames - 1)
+        return first, last
+
+    # Mean power spectrum of each [start, end] window (Welch average of its frames), (channels, windows, bins)
+    # The spectra of the last bead set are kept, so switching beads or coloring columns costs nothing.
+    def bead_spectra(self, starts, ends):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        key = (starts.tobytes(), ends.tobytes())
+        spectra = self._bead_spectra.get(key)
+        if spectra is None:
+            spectra = self._compute_bead_spectra(starts, ends)
+            self._bead_spectra = {key: spectra}
+        return spectra
+
+    def _compute_bead_spectra(self, starts, ends):
+        n_frames = self.power.shape[1]
+        if n_frames == 0 or len(starts) == 0:
+            return np.full((self.power.shape[0], len(starts), self.power.shape[2]), np.nan, dtype=np.float32)
+        first, last = self.frame_range(starts, ends)
+        # One reduceat pass over interleaved (first, last + 1) bounds: even segments are the windows'
+        # frames, odd ones the gaps between them (or a single frame where windows overlap)
+        bounds = np.column_stack((first, last + 1)).ravel()
+        # reduceat bounds must be valid frames, so windows ending on the last frame get it added after
+        at_end = (last == n_frames - 1) & (first < n_frames - 1)
+        bounds[1::2][last == n_frames - 1] = n_frames - 1
+        sums = np.add.reduceat(self.power, bounds, axis=1, dtype=np.float64)[:, ::2]
+        sums[:, at_end] += self.power[:, -1:]
+        spectra = (sums / (last - first + 1)[None, :, None]).astype(np.float32)
+        # Windows entirely outside this view have no frames of their own
+        outside = (ends < self.x_offset) | (starts > self.x_offset + (n_frames - 1) * self.hop + self.window - 1)
+        spectra[:, outside] = np.nan
+        return spectra
+
+    # Frames first..last averaged down to at most `columns` heatmap columns: (power, sample centres)
+    def screen_columns(self, first=0, last=None, columns=SCREEN_COLUMNS):
+        last = self.power.shape[1] - 1 if last is None else last
+        n = last - first + 1
+        if n <= columns:
+            return self.power[:, first:last + 1], self.frame_centers(first, last)
+        factor = -(-n // columns)
+        bounds = np.arange(first, last + 1, factor)
+        sizes = np.diff(np.append(bounds, last + 1))
+        pooled = np.add.reduceat(self.power[:, first:last + 1], bounds - first, axis=1) / sizes[None, :, None]
+        centers = self.x_offset + bounds * self.hop + (sizes * self.hop) // 2 + self.window // 2
+        return pooled.astype(np.float32), centers
+
+
+# --- Function: STFT power of every channel: all frames of a channel go through batched rffts ---
+def build_spectrogram(channels, window=STFT_WINDOW, hop=STFT_HOP, x_offset=0):
+    taper = np.hanning(window).astype(np.float32)
+    scale = np.float32(1.0 / (taper * taper).sum())
+    powers = []
+    for signal in channels:
+        signal = np.asarray(signal, dtype=np.float32)
+        if len(signal) < window:
+            signal = np.pad(signal, (0, window - len(signal)))
+        frames = sliding_window_view(signal, window)[::hop]
+        power = np.empty((len(frames), window // 2 + 1), dtype=np.float32)
+        for block in range(0, len(frames), FFT_BLOCK_FRAMES):
+            chunk = frames[block:block + FFT_BLOCK_FRAMES]
+            chunk = (chunk - chunk.mean(axis=1, keepdims=True)) * taper
+            power[block:block + len(chunk)] = np.abs(np.fft.rfft(chunk, axis=1)) ** 2 * scale
+        powers.append(power)
+    return Spectrogram(np.stack(powers), window, hop, x_offset)
+
+
+# --- Function: Spectrogram of a loaded signal view, built once per (file, view, window parameters) ---
+def load_spectrogram(zip_file, member, signals, x_offset=0, window=STFT_WINDOW, hop=STFT_HOP):
+    key = (zip_digest(zip_file), member, x_offset, signals.shape[1], window, hop)
+    spectrogram = spectral_cache.get(key)
+    count(spectral_cache="hit" if spectrogram is not None else "miss")
+    if spectrogram is None:
+        with stage("stft"):
+            spectrogram = build_spectrogram(signals, window, hop, x_offset)
+        spectral_cache.put(key, spectrogram)
+    return spectrogram
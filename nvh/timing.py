@@ -0,0 +1,93 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from nvh.metadata import CACHE_DIR
+
+# JSON-lines log shared by all sessions; set NVH_TIMING_LOG=off to disable
+TIMING_LOG = os.environ.get("NVH_TIMING_LOG", os.path.join(CACHE_DIR, "timing.jsonl"))
+
+_current = contextvars.ContextVar("nvh_timer", default=None)
+_log_lock = threading.Lock()
+
+
+# --- Class: Accumulated stage durations and payload counters for one viewer run ---
+class StageTimer:
+    def __init__(self, measure_payload=False, **context):
+        self.measure_payload = measure_payload
+        self.context = context
+        self.stages = {}
+        self.counters = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, **values):
+        self.counters.update(values)
+
+    def record(self):
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **self.context,
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            **self.counters
+        }
+
+
+def current_timer():
+    return _current.get()
+
+
+# --- Function: Time a block under the active timer (no-op outside a timing session) ---
+@contextmanager
+def stage(name):
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def add_stage(name, seconds):
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def count(**values):
+    timer = _current.get()
+    if timer is not None:
+        timer.count(**values)
+
+
+def append_log(record, path=TIMING_LOG):
+    if not path or path == "off":
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    except OSError:
+        pass  # Logging must never break the viewer
+
+
+# --- Function: Collect stage timings for one viewer run and append them to the log ---
+@contextmanager
+def timing_session(measure_payload=False, log_path=TIMING_LOG, **context):
+    timer = StageTimer(measure_payload, **context)
+    token = _current.set(timer)
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.add("total", time.perf_counter() - start)
+        _current.reset(token)
+        append_log(timer.record(), log_path)
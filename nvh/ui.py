@@ -0,0 +1,389 @@
+import io
+import os
+
+import numpy as np
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from nvh.cache import memory_budget
+from nvh.dataroot import DATA_ROOTS, list_datasets, within_roots
+from nvh.diff import METADATA_VERSIONS, load_diff
+from nvh.features import load_zip_features
+from nvh.ingest import start_ingest
+from nvh.labels import CLASSES, prediction_columns
+from nvh.metrics import load_disagreement, load_metrics
+from nvh.overlay import class_overlay
+from nvh.plotting import build_bead_spectra_figure, build_overlay_figure, build_spectrogram_figure
+from nvh.prefetch import prefetch_adjacent
+from nvh.signals import metadata_file_name
+from nvh.spectral import load_spectrogram
+from nvh.validate import load_validation
+from nvh.timing import count, current_timer, stage
+
+
+# --- Function: Sidebar controls for downsampled WebGL rendering ---
+# Returns the point budget, or None for full-resolution SVG rendering.
+def rendering_options():
+    st.sidebar.subheader("Rendering")
+    use_webgl = st.sidebar.toggle("Downsampled WebGL rendering", value=False)
+    point_budget = st.sidebar.number_input(
+        "Point budget per trace",
+        min_value=1000,
+        max_value=2000000,
+        value=50000,
+        step=1000,
+        disabled=not use_webgl
+    )
+    return int(point_budget) if use_webgl else None
+
+
+# --- Function: Sidebar choice of a dataset on the server (only offered when NVH_DATA_ROOT is set) ---
+# Returns the ZIP or directory path, or None to fall back to a browser upload.
+def server_dataset():
+    if not DATA_ROOTS:
+        return None
+    st.sidebar.subheader("Data source")
+    source = st.sidebar.radio("Data source", ["Server data root", "Upload ZIP"], label_visibility="collapsed")
+    if source != "Server data root":
+        return None
+    datasets = list_datasets()
+    if not datasets:
+        st.sidebar.warning("No ZIP files or signal directories under the data root.")
+        return None
+    path = datasets[st.sidebar.selectbox("Dataset", list(datasets))]
+    return path if within_roots(path) else None
+
+
+def source_name(zip_file):
+    if isinstance(zip_file, (str, os.PathLike)):
+        return os.path.splitext(os.path.basename(os.path.normpath(zip_file)))[0]
+    return os.path.splitext(zip_file.name)[0]
+
+
+# --- Function: Decode the files next to the selection in the background while it is on screen ---
+def prefetch_neighbours(zip_file, csv_files, selected_file):
+    return prefetch_adjacent(zip_file, csv_files, selected_file, owner=session_id())
+
+
+# --- Function: Preload every CSV of an uploaded ZIP and show progress in the sidebar ---
+# Server datasets are skipped: they are read on demand (and their neighbours prefetched) instead.
+def ingest_panel(zip_file, csv_files):
+    if isinstance(zip_file, (str, os.PathLike)):
+        return None
+    job = start_ingest(zip_file, csv_files)
+    polling = not job.done
+
+    @st.fragment(run_every=1.0 if polling else None)
+    def _progress():
+        if not job.done:
+            st.progress(job.progress, text=f"Preloading files {job.completed}/{job.total}")
+            return
+        if polling:
+            st.rerun()  # Full rerun stops the polling once ingestion has finished
+        total_samples = sum(job.samples.values())
+        st.caption(f"Preloaded {len(job.samples)} files ({total_samples:,} samples)")
+        if job.skipped:
+            st.caption(f"{len(job.skipped)} more files exceed the signal cache and are decoded when selected")
+        if job.errors:
+            st.warning(f"{len(job.errors)} of {job.total} files could not be parsed")
+
+    with st.sidebar:
+        _progress()
+    return job
+
+
+# --- Function: Warn about metadata label values outside the class list (their beads get no highlight) ---
+def unknown_labels_warning(summary_df):
+    unknown = summary_df.attrs.get("unknown_labels")
+    if unknown:
+        listed = "; ".join(f"{col}: {', '.join(values)}" for col, values in unknown.items())
+        st.warning(f"Unknown class labels in the metadata are shown without a highlight ({listed})")
+
+
+# --- Function: Sidebar switch for the data-quality report of the ZIP against the metadata ---
+# Returns the file list's format function, which marks files with errors or warnings.
+def validation_panel(zip_file, metadata_name):
+    if not st.sidebar.toggle("Validate files against metadata", value=False, key="validate_files"):
+        return str
+    with st.spinner("Validating files..."):
+        report = load_validation(zip_file, metadata_name)
+
+    counts = report["status"].value_counts()
+    with st.expander(f"Data quality report ({counts['error']} errors, {counts['warning']} warnings)",
+                     expanded=bool(counts["error"])):
+        st.caption(f"{len(report) - counts['missing']} files checked against {metadata_name}; "
+                   f"{counts['missing']} metadata files have no signal file here")
+        show_missing = st.toggle("List metadata files missing from the ZIP", value=False)
+        st.dataframe(report if show_missing else report[report["status"] != "missing"], hide_index=True)
+
+    flagged = report[report["status"].isin(["error", "warning"])]
+    marks = dict(zip(flagged["member"], flagged["status"].astype(str)))
+    return lambda member: f"[{marks[member]}] {member}" if member in marks else member
+
+
+# --- Function: Expander with per-model accuracy, per-class scores and confusion matrices ---
+def metrics_panel(metadata_name, summary_df, selected_file=None):
+    references = [col for col in ("refined_label", "original_file_label") if col in summary_df.columns]
+    if not references or not prediction_columns(summary_df):
+        return
+
+    with st.expander("Model comparison metrics"):
+        reference = st.selectbox("Reference label", references)
+        scope = st.radio("Scope", ["All files", "Selected file"], horizontal=True)
+        files = [metadata_file_name(selected_file)] if scope == "Selected file" and selected_file else None
+
+        first_bead = int(summary_df["bead_number"].min())
+        last_bead = int(summary_df["bead_number"].max())
+        bead_range = st.slider("Bead numbers", first_bead, last_bead, (first_bead, last_bead))
+        if bead_range == (first_bead, last_bead):
+            bead_range = None
+
+        metrics = load_metrics(metadata_name, reference, files, bead_range)
+        st.dataframe(metrics.summary.drop(columns="column"), hide_index=True)
+
+        model = st.selectbox("Model details", list(metrics.confusion))
+        st.dataframe(metrics.per_class[metrics.per_class["model"] == model].drop(columns="model"), hide_index=True)
+        st.caption(f"Confusion matrix ({reference} vs. {model} prediction)")
+        st.dataframe(metrics.confusion[model])
+
+
+# --- Function: Sidebar controls for loading only one bead's rows (plus a margin) ---
+# Returns the margin in samples, or None when whole files are loaded.
+def bead_focus_options():
+    st.sidebar.subheader("Bead focus")
+    enabled = st.sidebar.toggle("Load only the selected bead", value=False)
+    margin = st.sidebar.number_input(
+        "Margin (samples)",
+        min_value=0,
+        max_value=1000000,
+        value=2000,
+        step=500,
+        disabled=not enabled
+    )
+    return int(margin) if enabled else None
+
+
+# --- Function: Bead selector for one file; returns the bead's (start_index, end_index) ---
+def bead_picker(selected_file, bead_index):
+    beads = bead_index.get(metadata_file_name(selected_file))
+    if len(beads.bead_number) == 0:
+        st.warning("The selected file has no beads in the metadata.")
+        return None
+    position = st.selectbox(
+        "Bead",
+        range(len(beads.bead_number)),
+        format_func=lambda i: f"Bead {beads.bead_number[i]} ({beads.start_index[i]}-{beads.end_index[i]})"
+    )
+    return int(beads.start_index[position]), int(beads.end_index[position])
+
+
+# --- Function: Sidebar switch between browsing files and the worst-beads list ---
+def viewer_mode():
+    return st.sidebar.radio("Viewer mode", ["Browse files", "Worst beads", "Version diff", "Class overlay"])
+
+
+# --- Function: Beads of the uploaded files ranked by model disagreement, with row selection ---
+# Returns (ZIP member, (start_index, end_index)) of the selected bead, or None.
+def worst_beads_panel(metadata_name, csv_files, reference="refined_label"):
+    members = {metadata_file_name(member): member for member in csv_files}
+    index = load_disagreement(metadata_name, reference)
+    index = index[index["file"].isin(list(members))]
+    if index.empty:
+        st.info("None of the uploaded files are listed in the metadata.")
+        return None
+
+    limit = st.number_input("Beads to list", min_value=min(10, len(index)), max_value=len(index),
+                            value=min(100, len(index)), step=10)
+    worst = index.head(int(limit))
+    st.caption(f"{len(index):,} beads ranked by models wrong, then vote entropy")
+    event = st.dataframe(
+        worst.drop(columns=["start_index", "end_index"]),
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row"
+    )
+    if not event.selection.rows:
+        return None
+    bead = worst.iloc[event.selection.rows[0]]
+    return members[bead["file"]], (int(bead["start_index"]), int(bead["end_index"]))
+
+
+# --- Function: Beads whose label, predictions or bounds changed since another metadata version ---
+# Returns (ZIP member, (start_index, end_index)) of the selected bead in this viewer's metadata, or None.
+def version_diff_panel(metadata_name, csv_files, reference="refined_label"):
+    others = [name for name in METADATA_VERSIONS if name != metadata_name]
+    left_col, filter_col = st.columns([2, 1])
+    other = left_col.selectbox("Compare with metadata version", others, index=len(others) - 1)
+    relabeled_only = filter_col.toggle("Relabeled beads only", value=False)
+    result = load_diff(other, metadata_name, reference)
+
+    counts = result.counts
+    st.caption(
+        f"{counts['matched']:,} beads in both versions, {counts['left_only']:,} only in {other}, "
+        f"{counts['right_only']:,} only in {metadata_name}; {len(result.beads):,} changed"
+    )
+    st.dataframe(result.columns, hide_index=True)
+
+    members = {metadata_file_name(member): member for member in csv_files}
+    beads = result.beads[result.beads["file"].isin(list(members))]
+    if relabeled_only:
+        beads = beads[beads["relabeled"]]
+    if beads.empty:
+        st.info("No changed beads in the uploaded files.")
+        return None
+    event = st.dataframe(
+        beads.drop(columns=["start_index", "end_index"]),
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row"
+    )
+    if not event.selection.rows:
+        return None
+    bead = beads.iloc[event.selection.rows[0]]
+    return members[bead["file"]], (int(bead["start_index"]), int(bead["end_index"]))
+
+
+# --- Function: Expander with the STFT spectrogram and per-bead power spectra of the plotted file ---
+# The spectrogram is cached per file view, so picking another bead or coloring column only redraws.
+def spectral_panel(zip_file, member, signals, bead_index, column, x_offset=0):
+    with st.expander("Spectral view (STFT)"):
+        if not st.toggle("Show spectrogram and bead spectra", value=False, key="spectral_view"):
+            return
+        spectrogram = load_spectrogram(zip_file, member, signals, x_offset)
+        beads = bead_index.get(metadata_file_name(member))
+        codes = beads.codes[column] if column else np.full(len(beads.bead_number), -1)
+        class_names = [CLASSES[code] if code >= 0 else None for code in codes]
+
+        options = [None] + list(range(len(beads.bead_number)))
+        selected = st.selectbox(
+            "Bead",
+            options,
+            format_func=lambda i: "Whole file" if i is None
+            else f"Bead {beads.bead_number[i]} ({class_names[i] or 'n/a'})",
+            key="spectral_bead"
+        )
+        if selected is None:
+            show_figure(build_spectrogram_figure(spectrogram, title=f"Spectrogram of {metadata_file_name(member)}"))
+        else:
+            # The bead with one bead length of context either side, at full frame resolution
+            start, end = int(beads.start_index[selected]), int(beads.end_index[selected])
+            first, last = spectrogram.frame_range(start - (end - start), end + (end - start))
+            show_figure(build_spectrogram_figure(spectrogram, int(first), int(last), (start, end),
+                                                 f"Spectrogram around bead {beads.bead_number[selected]}"))
+        if len(beads.bead_number):
+            spectra = spectrogram.bead_spectra(beads.start_index, beads.end_index)
+            show_figure(build_bead_spectra_figure(spectra, spectrogram.freqs, beads.bead_number, class_names,
+                                                  selected, column))
+
+
+# --- Function: Every bead of one class across the ZIP, resampled and overlaid with mean and percentile bands ---
+def class_overlay_panel(zip_file, metadata_name, label_options):
+    column_col, class_col, traces_col = st.columns(3)
+    column = column_col.selectbox("Label or prediction column", label_options, key="overlay_column")
+    class_name = class_col.selectbox("Class", CLASSES, index=CLASSES.index("Weak Weld"), key="overlay_class")
+    max_traces = traces_col.number_input("Individual beads to draw", min_value=0, max_value=2000, value=200, step=50)
+
+    with st.spinner("Resampling beads..."):
+        overlay = class_overlay(zip_file, metadata_name, column, class_name)
+    if not len(overlay.file):
+        st.info(f"No {class_name} beads by {column} in these files.")
+        return
+    st.caption(f"{len(overlay.file):,} beads from {len(np.unique(overlay.file))} files")
+    show_figure(build_overlay_figure(overlay, class_name, column, int(max_traces)))
+
+
+# --- Function: Expander with the per-bead feature table for the whole ZIP, joined to labels/predictions ---
+def features_panel(zip_file, metadata_name):
+    with st.expander("Bead feature table"):
+        if not st.toggle("Compute features for every file in the ZIP", value=False):
+            return
+        with st.spinner("Extracting bead features..."):
+            table = load_zip_features(zip_file, metadata_name)
+        st.caption(f"{len(table):,} beads from {table['file'].nunique()} files")
+        st.dataframe(table, hide_index=True)
+
+        buffer = io.BytesIO()
+        table.to_parquet(buffer, index=False)
+        st.download_button(
+            "Download Parquet",
+            buffer.getvalue(),
+            file_name=f"{source_name(zip_file)}_bead_features.parquet",
+            mime="application/octet-stream"
+        )
+
+
+# --- Function: Sidebar toggle for the stage timing / payload debug panel ---
+def debug_options():
+    return st.sidebar.toggle("Show timing debug panel", value=False)
+
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+# --- Function: x-range that shows a (start, end) bead window with half its length (at least 200) either side ---
+def focus_window(focus_range, length):
+    start, end = focus_range
+    pad = max((end - start) // 2, 200)
+    return max(start - pad, 0), min(end + pad, length - 1)
+
+
+# --- Function: Visible x-range of the zoomable figure, driven by box selections on the chart ---
+# Returns (view_range or None for the whole file, chart key). A new chart key after every zoom
+# clears the consumed selection; initial_range (e.g. a bead window) applies when the target changes.
+def zoom_range(selected_file, length, initial_range=None):
+    state = st.session_state.setdefault("nvh_zoom", {"target": None, "range": None, "generation": 0})
+    target = (selected_file, initial_range)
+    if state["target"] != target:
+        if initial_range is not None:
+            initial_range = focus_window(initial_range, length)
+        state.update(target=target, range=initial_range, generation=state["generation"] + 1)
+
+    event = st.session_state.get(f"nvh_chart_{state['generation']}")
+    boxes = event["selection"]["box"] if event else []
+    if boxes:
+        x0, x1 = sorted(boxes[0]["x"])
+        first, last = max(int(np.floor(x0)), 0), min(int(np.ceil(x1)), length - 1)
+        if last > first:
+            state.update(range=(first, last), generation=state["generation"] + 1)
+
+    zoomed = state["range"] is not None
+    st.caption("Drag a box on the chart to load that x-range in more detail.")
+    if st.button("Reset zoom", disabled=not zoomed):
+        state.update(range=None, generation=state["generation"] + 1)
+    return state["range"], f"nvh_chart_{state['generation']}"
+
+
+# --- Function: Send a figure to the browser, recording payload size when requested ---
+# With a chart key, box selections rerun the script so zoom_range can load a finer level.
+def show_figure(fig, key=None):
+    timer = current_timer()
+    if timer is not None and timer.measure_payload:
+        with stage("figure_serialize"):
+            count(figure_bytes=len(fig.to_json()))
+    with stage("plotly_chart"):
+        if key is None:
+            st.plotly_chart(fig)
+        else:
+            fig.update_layout(dragmode="select", selectdirection="h")
+            st.plotly_chart(fig, key=key, on_select="rerun", selection_mode="box")
+
+
+# --- Function: Table of the last run's stage timings and payload counters (sidebar by default) ---
+# Fragments cannot write to the sidebar, so they pass their own container (e.g. st).
+def timing_panel(timer, visible, container=None):
+    if not visible:
+        return
+    with (container or st.sidebar).expander("Timing debug", expanded=True):
+        record = timer.record()
+        st.dataframe(
+            {"stage": list(record["stages_ms"]), "ms": list(record["stages_ms"].values())},
+            hide_index=True
+        )
+        for key in ("signal_cache", "base_layer", "traces", "points", "figure_bytes"):
+            if key in record:
+                value = record[key]
+                st.caption(f"{key}: {value:,}" if isinstance(value, int) else f"{key}: {value}")
+        # Process-wide caches shared by every session on this server
+        st.dataframe(memory_budget.stats(), hide_index=True)
@@ -0,0 +1,208 @@
+"""Check every signal file in a ZIP (or directory) against a metadata table.
+
+Flags unreadable files, wrong column counts or dtypes, non-numeric cells, NaN/inf runs, bead windows
+outside the signal or overlapping each other, and files missing from either side.
+
+Example:
+    python -m nvh.validate shift.zip --metadata 241113_NVH_metadata_v03_Robust.csv --out report.csv
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from nvh.cache import KeyLocks
+from nvh.ingest import INGEST_WORKERS, cached_member
+from nvh.metadata import load_bead_index, metadata_cache, metadata_version
+from nvh.signals import list_signal_members, metadata_file_name, open_member, shared_zip_source, zip_digest
+
+# Signal files hold NIR and VIS
+EXPECTED_COLUMNS = 2
+
+# Worst first; "missing" files are listed in the metadata but absent from this ZIP
+STATUSES = ["error", "warning", "missing", "ok"]
+
+REPORT_COLUMNS = [
+    "file", "member", "status", "samples", "columns", "beads", "out_of_range", "overlapping", "duplicate_beads",
+    "non_numeric", "nan_samples", "longest_nan_run", "nan_in_beads", "problems"
+]
+
+_key_lock = KeyLocks()
+
+
+# --- Function: Column count and non-numeric column names of a member, from its header only ---
+def _member_layout(source, member):
+    suffix = os.path.splitext(member)[1].lower()
+    with open_member(source, member) as file:
+        if suffix == ".csv":
+            header = file.readline().decode("utf-8", errors="replace")
+            return len(next(csv.reader([header]), [])), []
+        if suffix == ".npy":
+            version = np.lib.format.read_magic(file)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else \
+                np.lib.format.read_array_header_2_0
+            shape, _, dtype = read_header(file)
+            # Converted files are (2, n); other arrays are read as (n, columns)
+            columns = (shape[0] if shape[0] == EXPECTED_COLUMNS else shape[1]) if len(shape) == 2 else 1
+            return columns, [] if dtype.kind in "fiu" else [str(dtype)]
+        schema = pq.read_schema(io.BytesIO(file.read()))
+        numeric = lambda field: pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        fields = [schema.field(i) for i in range(min(len(schema), EXPECTED_COLUMNS))]
+        return len(schema), [field.name for field in fields if not numeric(field)]
+
+
+# --- Function: A CSV whose cells do not all parse, with bad cells as NaN: (signals, non-numeric cell count) ---
+def _coerce_csv(source, member):
+    with open_member(source, member) as file:
+        raw = pd.read_csv(file, dtype=str).iloc[:, :EXPECTED_COLUMNS]
+    values = raw.apply(pd.to_numeric, errors="coerce")
+    non_numeric = int((values.isna() & raw.notna()).to_numpy().sum())
+    return np.ascontiguousarray(values.to_numpy(dtype=np.float32).T), non_numeric
+
+
+# --- Function: Run lengths of True in a boolean mask ---
+def _runs(mask):
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+# --- Function: Vectorized bead-window checks: (out of range, overlapping, duplicate numbers, valid mask) ---
+def _check_windows(beads, length):
+    starts, ends = beads.start_index, beads.end_index
+    valid = (starts >= 0) & (ends < length) & (ends >= starts)
+    order = np.argsort(starts, kind="stable")
+    sorted_starts, sorted_ends = starts[order], ends[order]
+    # A bead overlaps when it starts at or before the furthest end of the beads before it
+    overlapping = int((sorted_starts[1:] <= np.maximum.accumulate(sorted_ends)[:-1]).sum()) if len(order) else 0
+    duplicates = len(beads.bead_number) - len(np.unique(beads.bead_number))
+    return int((~valid).sum()), overlapping, duplicates, valid
+
+
+# --- Function: Report row for one member (runs in a worker thread) ---
+def validate_member(zip_source, digest, member, beads):
+    row = {"file": metadata_file_name(member), "member": member, "beads": len(beads.bead_number)}
+    errors, warnings = [], []
+    if not len(beads.bead_number):
+        warnings.append("not in metadata")
+
+    try:
+        columns, bad_dtypes = _member_layout(zip_source, member)
+        row["columns"] = columns
+        if columns < EXPECTED_COLUMNS:
+            errors.append(f"{columns} columns (expected {EXPECTED_COLUMNS})")
+        elif columns > EXPECTED_COLUMNS:
+            warnings.append(f"{columns} columns (first {EXPECTED_COLUMNS} used)")
+        if bad_dtypes:
+            errors.append(f"non-numeric dtype: {', '.join(bad_dtypes)}")
+        try:
+            signals = cached_member(zip_source, digest, member)
+        except ValueError:
+            if not member.lower().endswith(".csv"):
+                raise
+            signals, row["non_numeric"] = _coerce_csv(zip_source, member)
+            errors.append(f"{row['non_numeric']} non-numeric cells")
+    except Exception as exc:
+        errors.append(f"unreadable: {exc}")
+        return _finish(row, errors, warnings)
+
+    length = signals.shape[1]
+    row["samples"] = length
+    if length == 0:
+        errors.append("no samples")
+
+    # NaN/inf per sample (either channel), as runs and inside bead windows
+    bad = ~np.isfinite(signals).all(axis=0)
+    runs = _runs(bad)
+    row["nan_samples"] = int(bad.sum())
+    row["longest_nan_run"] = int(runs.max()) if len(runs) else 0
+
+    if len(beads.bead_number):
+        out_of_range, overlapping, duplicates, valid = _check_windows(beads, length)
+        row.update(out_of_range=out_of_range, overlapping=overlapping, duplicate_beads=duplicates)
+        prefix = np.concatenate(([0], np.cumsum(bad, dtype=np.int64)))
+        starts, ends = beads.start_index[valid], beads.end_index[valid]
+        row["nan_in_beads"] = int((prefix[ends + 1] - prefix[starts]).sum())
+        if out_of_range:
+            errors.append(f"{out_of_range} bead windows outside the signal")
+        if overlapping:
+            warnings.append(f"{overlapping} overlapping bead windows")
+        if duplicates:
+            warnings.append(f"{duplicates} duplicate bead numbers")
+        if row["nan_in_beads"]:
+            errors.append(f"{row['nan_in_beads']} NaN samples inside beads")
+    if row["nan_samples"] and not row.get("nan_in_beads"):
+        warnings.append(f"{row['nan_samples']} NaN samples (longest run {row['longest_nan_run']})")
+    return _finish(row, errors, warnings)
+
+
+def _finish(row, errors, warnings):
+    row["status"] = "error" if errors else "warning" if warnings else "ok"
+    row["problems"] = "; ".join(errors + warnings)
+    return row
+
+
+# --- Function: One report row per member plus one per metadata file with no member, worst first ---
+def validate_zip(zip_file, bead_index, workers=INGEST_WORKERS):
+    members = list_signal_members(zip_file)
+    zip_source = shared_zip_source(zip_file)
+    digest = zip_digest(zip_file)
+
+    def run(member):
+        return validate_member(zip_source, digest, member, bead_index.get(metadata_file_name(member)))
+    with ThreadPoolExecutor(workers, thread_name_prefix="nvh-validate") as executor:
+        rows = list(executor.map(run, members))
+
+    present = {metadata_file_name(member) for member in members}
+    for name in sorted(set(bead_index.files) - present):
+        rows.append({"file": name, "status": "missing", "beads": len(bead_index.files[name].bead_number),
+                     "problems": "no signal file"})
+
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    for col in REPORT_COLUMNS[3:-1]:
+        report[col] = report[col].astype("Int64")
+    report["status"] = pd.Categorical(report["status"], categories=STATUSES, ordered=True)
+    return report.sort_values(["status", "file"], kind="stable").reset_index(drop=True)
+
+
+# --- Function: Validation report of a ZIP against a metadata table, cached per (ZIP, metadata version) ---
+def load_validation(zip_file, metadata_name, metadata_path=None, workers=INGEST_WORKERS):
+    key = ("validation", zip_digest(zip_file), metadata_version(metadata_name, metadata_path))
+    report = metadata_cache.get(key)
+    if report is None:
+        with _key_lock(key):
+            report = metadata_cache.peek(key)
+            if report is None:
+                report = validate_zip(zip_file, load_bead_index(metadata_name, metadata_path), workers)
+                metadata_cache.put(key, report)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every signal file in a ZIP against a metadata table.")
+    parser.add_argument("zip_path", help="ZIP file or directory containing the signal files (CSV, .npy, .parquet)")
+    parser.add_argument("--metadata", default="241113_NVH_metadata_v03_Robust.csv", help="metadata CSV name")
+    parser.add_argument("--metadata-path", help="explicit path to the metadata CSV")
+    parser.add_argument("--out", help="write the full report to this CSV")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="worker threads")
+    args = parser.parse_args(argv)
+
+    report = validate_zip(args.zip_path, load_bead_index(args.metadata, args.metadata_path), args.workers)
+    print(report["status"].value_counts(sort=False).to_string(), file=sys.stderr)
+    problems = report[report["status"].isin(["error", "warning"])]
+    if len(problems):
+        print(problems[["file", "status", "problems"]].to_string(index=False), file=sys.stderr)
+    if args.out:
+        report.to_csv(args.out, index=False)
+        print(f"{len(report)} files -> {args.out}", file=sys.stderr)
+    return 1 if (report["status"] == "error").any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Import the viewers' nvh package from the repository root, and keep Parquet caches out of it
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault("NVH_CACHE_DIR", tempfile.mkdtemp(prefix="nvh-test-cache-"))
+
+from benchmarks.synthetic import make_synthetic_dataset  # noqa: E402
+
+
+# --- Fixture: Small synthetic ZIP plus metadata, shared by every test: (zip_path, metadata_path) ---
+@pytest.fixture(scope="session")
+def synthetic_dataset(tmp_path_factory):
+    return make_synthetic_dataset(str(tmp_path_factory.mktemp("synthetic")), n_files=3, samples=20_000, beads=5)
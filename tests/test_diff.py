@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from nvh.diff import diff_metadata
+from nvh.labels import label_columns
+from nvh.metadata import load_metadata
+
+LEFT, RIGHT = "241113_NVH_metadata_ML.csv", "241113_NVH_metadata_v03_Robust.csv"
+
+
+# Bundled pair joined the slow way: one pandas merge on (file, bead_number)
+def merged_pair():
+    left, right = load_metadata(LEFT), load_metadata(RIGHT)
+    keys = ["file", "bead_number"]
+    as_text = lambda df: df.assign(**{col: df[col].astype(object) for col in ["file"] + label_columns(df)})
+    merged = as_text(left).merge(as_text(right), on=keys, suffixes=("_left", "_right"))
+    return left, right, merged
+
+
+def changed(merged, col):
+    before, after = merged[f"{col}_left"], merged[f"{col}_right"]
+    return ~((before == after) | (before.isna() & after.isna()))
+
+
+def test_counts_match_a_merge():
+    left, right, merged = merged_pair()
+    result = diff_metadata(left, right)
+    assert result.counts["matched"] == len(merged)
+    assert result.counts["left_only"] == len(left) - len(merged)
+    assert result.counts["right_only"] == len(right) - len(merged)
+
+
+def test_changed_beads_match_a_merge():
+    left, right, merged = merged_pair()
+    result = diff_metadata(left, right)
+    columns = [col for col in label_columns(left) if col in right.columns]
+
+    any_change = np.zeros(len(merged), dtype=bool)
+    for col in columns:
+        any_change |= changed(merged, col).to_numpy()
+    for bound in ("start_index", "end_index"):
+        any_change |= (merged[f"{bound}_left"] != merged[f"{bound}_right"]).to_numpy()
+    expected = merged.loc[any_change, ["file", "bead_number"]]
+    got = result.beads[["file", "bead_number"]].astype({"file": object})
+    pd.testing.assert_frame_equal(got.sort_values(["file", "bead_number"]).reset_index(drop=True),
+                                  expected.sort_values(["file", "bead_number"]).reset_index(drop=True))
+
+    relabeled = merged.loc[changed(merged, "refined_label"), ["file", "bead_number"]]
+    assert result.beads["relabeled"].sum() == len(relabeled)
+    # Relabeled beads are listed first
+    assert not result.beads["relabeled"].iloc[len(relabeled):].any()
+
+
+def test_column_table_counts_changes_per_column():
+    left, right, merged = merged_pair()
+    table = diff_metadata(left, right).columns.set_index("column")
+    for col in [col for col in label_columns(left) if col in right.columns]:
+        both = merged[f"{col}_left"].notna() & merged[f"{col}_right"].notna()
+        assert table.loc[col, "compared"] == both.sum()
+        assert table.loc[col, "changed"] == (changed(merged, col) & both).sum()
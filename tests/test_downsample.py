@@ -0,0 +1,42 @@
+import numpy as np
+
+from nvh.downsample import minmax_grid
+from nvh.plotting import segment_positions
+
+
+def test_segment_positions_are_nan_separated_windows():
+    positions, owner = segment_positions([5, 20], [9, 22], length=30)
+    expected = [5, 6, 7, 8, 9, np.nan, 20, 21, 22, np.nan]
+    np.testing.assert_array_equal(positions, expected)
+    np.testing.assert_array_equal(owner, [0] * 6 + [1] * 4)
+
+
+def test_segment_positions_clip_to_the_signal():
+    positions, _ = segment_positions([-3, 27, 40], [1, 35, 45], length=30)
+    np.testing.assert_array_equal(positions, [0, 1, np.nan, 27, 28, 29, np.nan, np.nan])
+
+
+def test_minmax_grid_keeps_anchors_and_extremes():
+    rng = np.random.default_rng(1)
+    channels = rng.normal(size=(2, 200_000)).astype(np.float32)
+    starts = np.sort(rng.choice(200_000, 40, replace=False))
+    ends = np.minimum(starts + rng.integers(100, 3000, 40), 199_999)
+    anchors = np.concatenate((starts, ends))
+
+    grid = minmax_grid(channels, 5000, anchors)
+    assert np.isin(anchors, grid).all()
+    assert grid[0] == 0 and grid[-1] == 199_999
+    assert np.all(np.diff(grid) > 0)
+    for signal in channels:
+        assert signal[grid].min() == signal.min()
+        assert signal[grid].max() == signal.max()
+        # Every bead window keeps its own extremes too, so highlights cut from the grid are faithful
+        for start, end in zip(starts, ends):
+            window = grid[(grid >= start) & (grid <= end)]
+            assert signal[window].min() == signal[start:end + 1].min()
+            assert signal[window].max() == signal[start:end + 1].max()
+
+
+def test_minmax_grid_is_full_resolution_within_budget():
+    channels = np.zeros((2, 1000), dtype=np.float32)
+    np.testing.assert_array_equal(minmax_grid(channels, 1000), np.arange(1000))
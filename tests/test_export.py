@@ -0,0 +1,50 @@
+import os
+import zipfile
+
+import pytest
+
+from nvh.export import exported_files, load_dataset, main, read_manifest
+
+
+@pytest.fixture
+def export(synthetic_dataset):
+    _, metadata_path = synthetic_dataset
+
+    def run(source, out_dir):
+        return main([str(source), str(out_dir), "--metadata", os.path.basename(metadata_path),
+                     "--metadata-path", metadata_path, "--workers", "1"])
+    return run
+
+
+def parts(out_dir):
+    return sorted(name for name in os.listdir(out_dir) if name.startswith("part-"))
+
+
+def test_export_appends_only_new_files(synthetic_dataset, export, tmp_path):
+    zip_path, _ = synthetic_dataset
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        members = sorted(name for name in zip_ref.namelist() if name.lower().endswith(".csv"))
+        first_source = tmp_path / "first"
+        zip_ref.extract(members[0], first_source)
+    out_dir = tmp_path / "dataset"
+
+    # One file from a directory, then the whole ZIP: only the files not yet exported are written
+    assert export(first_source, out_dir) == 0
+    assert len(parts(out_dir)) == 1
+    assert exported_files(out_dir) == {os.path.basename(members[0])}
+    first_beads = load_dataset(out_dir).num_rows
+
+    assert export(zip_path, out_dir) == 0
+    assert len(parts(out_dir)) == 2
+    assert exported_files(out_dir) == {os.path.basename(member) for member in members}
+    table = load_dataset(out_dir, columns=["file"])
+    assert table.num_rows == sum(part["beads"] for part in read_manifest(out_dir)["parts"])
+    assert table.num_rows > first_beads
+    assert table["file"].to_pylist().count(os.path.basename(members[0])) == first_beads
+
+    # Nothing left to export: no new part, the dataset and manifest are unchanged
+    manifest = read_manifest(out_dir)
+    assert export(zip_path, out_dir) == 0
+    assert len(parts(out_dir)) == 2
+    assert read_manifest(out_dir) == manifest
+    assert load_dataset(out_dir).num_rows == table.num_rows
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from nvh.labels import CLASSES
+from nvh.metadata import to_columnar
+from nvh.metrics import compute_metrics
+
+
+# Naive per-row confusion matrix of one prediction column against the reference
+def naive_confusion(raw_df, reference, column):
+    matrix = np.zeros((len(CLASSES), len(CLASSES)), dtype=np.int64)
+    for truth, predicted in zip(raw_df[reference], raw_df[column]):
+        if isinstance(truth, str) and isinstance(predicted, str):
+            matrix[CLASSES.index(truth), CLASSES.index(predicted)] += 1
+    return matrix
+
+
+def test_confusion_matches_naive_count(synthetic_dataset):
+    _, metadata_path = synthetic_dataset
+    raw_df = pd.read_csv(metadata_path)
+    metrics = compute_metrics(to_columnar(raw_df), "refined_label")
+
+    for column in [col for col in raw_df.columns if col.endswith("_Prediction")]:
+        model = column.removesuffix("_Prediction")
+        expected = naive_confusion(raw_df, "refined_label", column)
+        np.testing.assert_array_equal(metrics.confusion[model].to_numpy(), expected)
+        row = metrics.summary.set_index("model").loc[model]
+        assert row["scored_beads"] == expected.sum()
+        assert np.isclose(row["accuracy"], np.trace(expected) / expected.sum())
+
+
+def test_slice_by_file_and_bead_range(synthetic_dataset):
+    _, metadata_path = synthetic_dataset
+    raw_df = pd.read_csv(metadata_path)
+    file_name = raw_df["file"].iloc[0]
+    metrics = compute_metrics(to_columnar(raw_df), "refined_label", files=[file_name], bead_range=(2, 4))
+
+    subset = raw_df[(raw_df["file"] == file_name) & raw_df["bead_number"].between(2, 4)]
+    column = next(col for col in raw_df.columns if col.endswith("_Prediction"))
+    expected = naive_confusion(subset, "refined_label", column)
+    np.testing.assert_array_equal(metrics.confusion[column.removesuffix("_Prediction")].to_numpy(), expected)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nvh.metadata import BeadIndex, to_columnar
+from nvh.pyramid import build_pyramid, pyramid_grid
+from nvh.signals import list_signal_members, load_signals, metadata_file_name
+
+
+@pytest.fixture(scope="module")
+def synthetic_file(synthetic_dataset):
+    zip_path, metadata_path = synthetic_dataset
+    bead_index = BeadIndex(to_columnar(pd.read_csv(metadata_path)))
+    member = list_signal_members(zip_path)[0]
+    return zip_path, member, load_signals(zip_path, member), bead_index
+
+
+def test_whole_file_grid_keeps_bead_bounds_and_extremes(synthetic_file):
+    zip_path, member, signals, bead_index = synthetic_file
+    beads = bead_index.get(metadata_file_name(member))
+    grid = pyramid_grid(zip_path, member, signals, bead_index, None, 2000)
+
+    assert len(grid) < signals.shape[1]
+    assert grid[0] == 0 and grid[-1] == signals.shape[1] - 1
+    assert np.isin(beads.start_index, grid).all() and np.isin(beads.end_index, grid).all()
+    for signal in signals:
+        assert signal[grid].min() == signal.min()
+        assert signal[grid].max() == signal.max()
+
+
+def test_zoomed_grid_keeps_view_ends_and_bead_bounds(synthetic_file):
+    zip_path, member, signals, bead_index = synthetic_file
+    beads = bead_index.get(metadata_file_name(member))
+    first, last = int(beads.start_index[1]) - 500, int(beads.end_index[2]) + 500
+    grid = pyramid_grid(zip_path, member, signals, bead_index, (first, last), 1000)
+
+    assert grid[0] == first and grid[-1] == last
+    inside = lambda values: values[(values >= first) & (values <= last)]
+    assert np.isin(inside(beads.start_index), grid).all() and np.isin(inside(beads.end_index), grid).all()
+
+
+def test_views_within_budget_are_full_resolution(synthetic_file):
+    zip_path, member, signals, bead_index = synthetic_file
+    np.testing.assert_array_equal(pyramid_grid(zip_path, member, signals, bead_index, (100, 599), 1000),
+                                  np.arange(100, 600))
+
+
+@pytest.mark.parametrize("length", [33, 1000, 4097])
+def test_coarsest_level_holds_the_true_extremes(length):
+    signals = np.random.default_rng(length).normal(size=(2, length)).astype(np.float32)
+    coarsest = build_pyramid(signals).levels[-1]
+    assert coarsest.shape[1] == 1
+    # Rows alternate min/max per channel
+    for row, position in enumerate(coarsest[:, 0]):
+        reduce = np.min if row % 2 == 0 else np.max
+        assert signals[row // 2][position] == reduce(signals[row // 2])
@@ -0,0 +1,52 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nvh import rowindex
+from nvh.cache import LRUCache
+from nvh.rowindex import load_signal_range
+from nvh.signals import parse_signal_csv
+
+ROWS = 25_000
+RANGES = [(0, 0), (0, 10), (1023, 1025), (5000, 9000), (ROWS - 5, ROWS - 1), (ROWS - 3, ROWS + 100), (-10, 3)]
+
+
+@pytest.fixture(scope="module")
+def signal_csv(tmp_path_factory):
+    rng = np.random.default_rng(2)
+    frame = pd.DataFrame({"NIR": rng.normal(size=ROWS), "VIS": rng.normal(size=ROWS)})
+    path = tmp_path_factory.mktemp("csv") / "signal.csv"
+    frame.to_csv(path, index=False, float_format="%.6f")
+    with open(path, "rb") as f:
+        return path, parse_signal_csv(f)
+
+
+@pytest.fixture(params=[zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED], ids=["stored", "deflated"])
+def signal_zip(request, signal_csv, tmp_path, monkeypatch):
+    # Small chunks and frequent inflate snapshots so reads resume from checkpoints mid-member
+    monkeypatch.setattr(rowindex, "CHUNK_BYTES", 4096)
+    monkeypatch.setattr(rowindex, "CHECKPOINT_BYTES", 64 << 10)
+    zip_path = tmp_path / "signals.zip"
+    with zipfile.ZipFile(zip_path, "w", request.param) as zip_ref:
+        zip_ref.write(signal_csv[0], "shift/signal.csv")
+    return str(zip_path)
+
+
+@pytest.mark.parametrize("first, last", RANGES)
+def test_read_rows_matches_full_parse(signal_zip, signal_csv, first, last):
+    full = signal_csv[1]
+    signals, start = load_signal_range(signal_zip, "shift/signal.csv", first, last, cache=LRUCache(0, "test", budget=None))
+    expected_start = min(max(first, 0), ROWS - 1)
+    assert start == expected_start
+    np.testing.assert_array_equal(signals, full[:, expected_start:min(max(last, expected_start), ROWS - 1) + 1])
+
+
+def test_row_index_counts_rows_and_checkpoints(signal_zip):
+    index = rowindex.row_index(signal_zip, "shift/signal.csv")
+    assert index.n_rows == ROWS
+    assert len(index.row_offsets) == -(-ROWS // rowindex.ROW_STRIDE)
+    if index.deflated:
+        assert len(index.checkpoints) > 1
+    assert index.nbytes >= index.row_offsets.nbytes
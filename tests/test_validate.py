@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from nvh.metadata import FileBeads
+from nvh.validate import validate_member
+
+
+def beads(*windows):
+    starts, ends = (np.array(values, dtype=np.int64) for values in zip(*windows))
+    return FileBeads(np.arange(1, len(windows) + 1), starts, ends, {})
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    def write(name, rows, header="NIR,VIS"):
+        (tmp_path / name).write_text("\n".join([header] + rows) + "\n")
+        return str(tmp_path), name
+    return write
+
+
+def run(source, member, file_beads):
+    # The directory path doubles as the signal cache digest, so every test parses its own files
+    return validate_member(source, f"test:{source}", member, file_beads)
+
+
+def test_clean_file_is_ok(write_csv):
+    row = run(*write_csv("clean.csv", [f"{i},{i}" for i in range(100)]), beads((0, 40), (50, 99)))
+    assert row["status"] == "ok" and row["problems"] == ""
+    assert row["samples"] == 100 and row["nan_samples"] == 0
+
+
+def test_nan_inside_a_bead_is_an_error(write_csv):
+    rows = [f"{i},{i}" for i in range(100)]
+    rows[10] = "1.0,"
+    rows[11] = ",2.0"
+    row = run(*write_csv("nan.csv", rows), beads((0, 40), (50, 99)))
+    assert row["status"] == "error"
+    assert row["nan_samples"] == 2 and row["longest_nan_run"] == 2 and row["nan_in_beads"] == 2
+
+
+def test_nan_outside_beads_is_a_warning(write_csv):
+    rows = [f"{i},{i}" for i in range(100)]
+    rows[45] = ","
+    row = run(*write_csv("gap.csv", rows), beads((0, 40), (50, 99)))
+    assert row["status"] == "warning"
+    assert row["nan_samples"] == 1 and row["nan_in_beads"] == 0
+
+
+def test_non_numeric_cells_are_counted(write_csv):
+    rows = [f"{i},{i}" for i in range(100)]
+    rows[3] = "abc,1.0"
+    rows[7] = "2.0,n/a?"
+    row = run(*write_csv("text.csv", rows), beads((0, 99)))
+    assert row["status"] == "error"
+    assert row["non_numeric"] == 2
+    assert "2 non-numeric cells" in row["problems"]
+
+
+def test_bead_windows_outside_or_overlapping(write_csv):
+    source, member = write_csv("windows.csv", [f"{i},{i}" for i in range(100)])
+    row = run(source, member, beads((0, 40), (30, 60), (90, 120), (-5, 10)))
+    assert row["status"] == "error"
+    assert row["out_of_range"] == 2
+    assert row["overlapping"] == 2
+
+
+def test_column_count(write_csv):
+    source, member = write_csv("one_column.csv", [str(i) for i in range(10)], header="NIR")
+    assert run(source, member, beads((0, 5)))["status"] == "error"
+    source, member = write_csv("three_columns.csv", [f"{i},{i},{i}" for i in range(10)], header="NIR,VIS,T")
+    row = run(source, member, beads((0, 5)))
+    assert row["status"] == "warning" and row["columns"] == 3